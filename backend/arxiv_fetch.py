@@ -0,0 +1,132 @@
+import arxiv
+import asyncio
+import datetime
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import get_metrics
+from papers import paper_record
+
+ARXIV_MAX_RESULTS = int(os.environ.get("ARXIV_MAX_RESULTS", 50))
+# Within this many seconds of the last fetch a topic is served from the cache
+ARXIV_REFRESH_INTERVAL = float(os.environ.get("ARXIV_REFRESH_INTERVAL", 300))
+ARXIV_CACHE_TOPICS = 256
+
+# One client for the whole process so arXiv's request spacing is respected
+_client = arxiv.Client()
+_topic_cache = OrderedDict()
+_topic_cache_lock = threading.Lock()
+
+
+def paper_from_result(result):
+    """
+    Convert an arxiv.Result into the paper record used throughout the pipeline.
+    """
+    return paper_record(
+        {
+            "title": result.title,
+            "authors": [author.name for author in result.authors],
+            "summary": result.summary,
+            "published": result.published.strftime("%Y-%m-%d"),
+            "pdf_url": result.pdf_url,
+            "entry_id": result.entry_id,
+            "comment": (result.comment if hasattr(result, "comment") else None),
+            "doi": result.doi if hasattr(result, "doi") else None,
+        }
+    )
+
+
+def window_query(topic, start, end):
+    """
+    Restrict the topic query to papers submitted between start and end, so
+    arXiv does the date filtering instead of us dropping results client-side.
+    """
+    window = f"submittedDate:[{start:%Y%m%d%H%M} TO {end:%Y%m%d%H%M}]"
+    return f"({topic}) AND {window}" if topic else window
+
+
+def _search(query, max_results):
+    """
+    Blocking arXiv search returning (published, paper) pairs, newest first.
+    """
+    search = arxiv.Search(
+        query=query, max_results=max_results, sort_by=arxiv.SortCriterion.SubmittedDate
+    )
+    return [
+        (
+            result.published.replace(tzinfo=datetime.timezone.utc),
+            paper_from_result(result),
+        )
+        for result in _client.results(search)
+    ]
+
+
+async def _search_async(query, max_results):
+    # The arxiv package is synchronous, so keep it off the event loop
+    loop = asyncio.get_running_loop()
+    with get_metrics().stage("arxiv_search"):
+        return await loop.run_in_executor(None, _search, query, max_results)
+
+
+async def fetch_window(topic, start, end, max_results=ARXIV_MAX_RESULTS):
+    """
+    Uncached search for papers on a topic submitted between start and end,
+    newest first.
+    """
+    results = await _search_async(window_query(topic, start, end), max_results)
+    return [paper for _, paper in results]
+
+
+async def fetch_papers(topic, cutoff_date, max_results=ARXIV_MAX_RESULTS):
+    """
+    The newest papers on a topic published on or after cutoff_date.
+
+    Results are cached per topic. A repeat request within
+    ARXIV_REFRESH_INTERVAL is answered from the cache; after that only papers
+    newer than the newest cached one are fetched and merged in. A request
+    reaching further back than the cached window triggers a full fetch.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    key = topic.strip().lower()
+    with _topic_cache_lock:
+        entry = _topic_cache.get(key)
+        if entry is not None:
+            _topic_cache.move_to_end(key)
+
+    # The cache can answer if it reaches back far enough, or if it already
+    # holds a full page: the answer is then the newest max_results papers
+    # either way, whatever the window
+    if entry is not None and (
+        entry["covered_from"] <= cutoff_date or len(entry["papers"]) >= max_results
+    ):
+        if time.time() - entry["fetched_at"] > ARXIV_REFRESH_INTERVAL:
+            get_metrics().count("arxiv_cache", result="refresh")
+            newest = entry["papers"][0][0] if entry["papers"] else entry["covered_from"]
+            fresh = await _search_async(window_query(topic, newest, now), max_results)
+            known = {paper["entry_id"] for _, paper in entry["papers"]}
+            merged = [item for item in fresh if item[1]["entry_id"] not in known]
+            merged = sorted(
+                merged + entry["papers"], key=lambda item: item[0], reverse=True
+            )
+            entry = _store(key, merged[:max_results], entry["covered_from"])
+        else:
+            get_metrics().count("arxiv_cache", result="hit")
+        papers = entry["papers"]
+    else:
+        get_metrics().count("arxiv_cache", result="miss")
+        papers = await _search_async(window_query(topic, cutoff_date, now), max_results)
+        _store(key, papers, cutoff_date)
+
+    return [paper for published, paper in papers if published >= cutoff_date]
+
+
+def _store(key, papers, covered_from):
+    entry = {"papers": papers, "covered_from": covered_from, "fetched_at": time.time()}
+    with _topic_cache_lock:
+        _topic_cache[key] = entry
+        _topic_cache.move_to_end(key)
+        if len(_topic_cache) > ARXIV_CACHE_TOPICS:
+            _topic_cache.popitem(last=False)
+    return entry
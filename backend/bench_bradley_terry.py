@@ -0,0 +1,107 @@
+"""
+Microbenchmark the vectorized Bradley-Terry solver against the original
+pure-Python implementation.
+
+For each pool size a random comparison graph with about n log2 n games is
+drawn from known scores. The new solver is timed on the dense win matrix
+and on the sparse (winners, losers, counts, n) form; the original loop is
+timed directly up to --legacy-max-n and extrapolated as O(n^2) above it.
+
+Usage: python bench_bradley_terry.py [--n 50 500 5000]
+"""
+
+import argparse
+import math
+import time
+import numpy as np
+
+from ranking import bradley_terry_fit
+
+
+def legacy_bradley_terry_scores(win_matrix):
+    """
+    The original fixed 10-iteration double loop, kept here for comparison.
+    """
+    n = len(win_matrix)
+    scores = np.ones(n)
+    for _ in range(10):
+        for i in range(n):
+            denom = 0
+            for j in range(n):
+                if i != j:
+                    denom += (win_matrix[i, j] + win_matrix[j, i]) / (
+                        scores[i] + scores[j]
+                    )
+            if denom > 0:
+                num = np.sum(win_matrix[i, :])
+                scores[i] = num / denom if num > 0 else scores[i]
+    return scores / np.sum(scores)
+
+
+def random_comparisons(n, rng):
+    true_scores = np.exp(rng.normal(0, 1, n))
+    games = math.ceil(n * math.log2(n))
+    first = rng.integers(0, n, games)
+    second = (first + rng.integers(1, n, games)) % n
+    p = true_scores[first] / (true_scores[first] + true_scores[second])
+    first_won = rng.random(games) < p
+    winners = np.where(first_won, first, second)
+    losers = np.where(first_won, second, first)
+    win_matrix = np.zeros((n, n))
+    np.add.at(win_matrix, (winners, losers), 1)
+    return win_matrix, (winners, losers, np.ones(games), n), true_scores
+
+
+def timed(function, *args, repeat=3, **kwargs):
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def rank_correlation(a, b):
+    ranks_a = np.argsort(np.argsort(a))
+    ranks_b = np.argsort(np.argsort(b))
+    return np.corrcoef(ranks_a, ranks_b)[0, 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--legacy-max-n", type=int, default=500)
+    parser.add_argument("--prior", type=float, default=0.5)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    print(
+        f"{'n':>6}{'legacy s':>12}{'dense s':>12}{'sparse s':>12}"
+        f"{'speedup':>10}{'iters':>7}{'rank corr':>11}"
+    )
+    legacy_reference = None
+    for n in args.n:
+        win_matrix, edges, true_scores = random_comparisons(n, rng)
+        if n <= args.legacy_max_n:
+            legacy_time, _ = timed(legacy_bradley_terry_scores, win_matrix, repeat=1)
+            legacy_reference = (n, legacy_time)
+            legacy_label = f"{legacy_time:>12.4f}"
+        elif legacy_reference:
+            ref_n, ref_time = legacy_reference
+            legacy_time = ref_time * (n / ref_n) ** 2
+            legacy_label = f"{legacy_time:>11.1f}~"
+        else:
+            legacy_time, legacy_label = math.nan, f"{'-':>12}"
+
+        dense_time, _ = timed(bradley_terry_fit, win_matrix, prior=args.prior)
+        sparse_time, fit = timed(bradley_terry_fit, edges, prior=args.prior)
+        print(
+            f"{n:>6}{legacy_label}{dense_time:>12.4f}{sparse_time:>12.4f}"
+            f"{legacy_time / sparse_time:>10.0f}x{fit['iterations']:>6}"
+            f"{rank_correlation(fit['scores'], true_scores):>11.3f}"
+        )
+    print("~ extrapolated from the largest measured legacy run")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark accuracy against tokens for each abstract compaction level.
+
+Samples pairs of papers from a recorded fixture (see bench_pipeline.py
+--record) and judges every pair with the real comparison prompt at each
+level of PROMPT_SUMMARY_WORDS. Judgments with full abstracts (level 0) are
+the reference: each level reports how often it agrees with them, next to
+the input and output tokens it used. Needs OPENAI_API_KEY, except with
+--dry-run, which only counts the prompt tokens each level would send.
+
+Usage: python bench_compaction.py --fixture papers.json [--levels 0 40 80 120]
+       [--pairs 100] [--question "..."] [--dry-run]
+"""
+
+import argparse
+import asyncio
+import json
+
+import aiohttp
+import numpy as np
+
+from conductor import compare_papers, comparison_prompt
+from llm_scheduler import estimate_tokens
+
+
+async def judge_pairs(papers, pairs, question, level, session):
+    """
+    Winners for every pair at one compaction level, with the token usage.
+    """
+    usage = {"requests": 0, "input_tokens": 0, "output_tokens": 0}
+    winners = await asyncio.gather(
+        *(
+            compare_papers(
+                papers[i],
+                papers[j],
+                question,
+                session,
+                fallback=False,
+                usage=usage,
+                max_words=level,
+            )
+            for i, j in pairs
+        )
+    )
+    return winners, usage
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--fixture", required=True, help="JSON list of paper dicts")
+    parser.add_argument("--levels", type=int, nargs="+", default=[0, 40, 80, 120])
+    parser.add_argument("--pairs", type=int, default=100)
+    parser.add_argument(
+        "--question",
+        default="What are the latest advancements in uncertainty estimation in neural networks?",
+    )
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with open(args.fixture) as f:
+        papers = json.load(f)
+    rng = np.random.default_rng(args.seed)
+    pairs = [
+        tuple(int(i) for i in rng.choice(len(papers), 2, replace=False))
+        for _ in range(args.pairs)
+    ]
+    # Full abstracts are always judged, as the reference
+    levels = sorted(set(args.levels) | {0})
+
+    print(
+        f"{'words':>7}{'prompt tokens':>15}{'vs full':>9}"
+        f"{'input tokens':>14}{'output tokens':>15}{'agreement':>11}"
+    )
+    full_tokens = None
+    reference = None
+
+    async def run():
+        async with aiohttp.ClientSession() as session:
+            return [
+                await judge_pairs(papers, pairs, args.question, level, session)
+                for level in levels
+            ]
+
+    results = [(None, None)] * len(levels) if args.dry_run else asyncio.run(run())
+    for level, (winners, usage) in zip(levels, results):
+        estimated = np.mean(
+            [
+                estimate_tokens(
+                    comparison_prompt(papers[i], papers[j], args.question, level)
+                )
+                for i, j in pairs
+            ]
+        )
+        if level == 0:
+            full_tokens = estimated
+            reference = winners
+        ratio = f"{estimated / full_tokens:>8.2f}x" if full_tokens else f"{'-':>9}"
+        line = f"{level or 'full':>7}{estimated:>15.0f}{ratio}"
+        if winners is not None:
+            judged = [
+                (winner, expected)
+                for winner, expected in zip(winners, reference)
+                if winner is not None and expected is not None
+            ]
+            agreement = np.mean([w == e for w, e in judged]) if judged else float("nan")
+            line += (
+                f"{usage['input_tokens'] / max(usage['requests'], 1):>14.0f}"
+                f"{usage['output_tokens'] / max(usage['requests'], 1):>15.1f}"
+                f"{agreement:>11.3f}"
+            )
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark Paper records against plain paper dicts.
+
+Builds a pool of papers both ways and reports the memory each takes (the
+text itself is shared and not counted), then the time to encode a response
+listing --listed of them (like a "candidates" event or a batch result) with
+json.dumps on dicts against papers.dumps on records, whose per-paper JSON is
+encoded once and reused.
+
+Usage: python bench_papers.py [--n 10000] [--listed 30 300] [--repeat 2000]
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+import numpy as np
+
+from papers import Paper, dumps, paper_record
+
+WORDS = (
+    "model neural data learning uncertainty network training results method "
+    "bayesian estimation calibration ensemble deep inference robust"
+).split()
+
+
+def paper_dicts(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "title": f"Paper {i}: " + " ".join(rng.choice(WORDS, 8)),
+            "authors": [f"Author {j}" for j in range(int(rng.integers(1, 8)))],
+            "summary": " ".join(rng.choice(WORDS, 200)),
+            "published": "2024-01-01",
+            "pdf_url": f"http://arxiv.org/pdf/{i}",
+            "entry_id": f"http://arxiv.org/abs/bench{i}",
+            "comment": None,
+            "doi": None,
+        }
+        for i in range(n)
+    ]
+
+
+def footprint(make):
+    """
+    Bytes allocated by make() that are still alive once it returns.
+    """
+    tracemalloc.start()
+    kept = make()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def per_call(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--n", type=int, default=10000)
+    parser.add_argument("--listed", type=int, nargs="+", default=[30, 300])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    # The text is shared, as it is between a response and the fetch it came from
+    dicts = paper_dicts(args.n)
+    copies = footprint(lambda: [dict(paper) for paper in dicts])
+    records = footprint(lambda: [Paper(**paper) for paper in dicts])
+    print(f"{'papers':>8}{'dict bytes':>14}{'record bytes':>14}")
+    print(f"{args.n:>8}{copies / args.n:>14.0f}{records / args.n:>14.0f}")
+
+    print(f"\n{'listed':>8}{'json.dumps us':>15}{'papers.dumps us':>17}{'speedup':>9}")
+    for listed in args.listed:
+        plain = {"status": "success", "candidates": dicts[:listed]}
+        shared = {
+            "status": "success",
+            "candidates": [paper_record(paper) for paper in dicts[:listed]],
+        }
+        assert json.loads(dumps(shared)) == json.loads(json.dumps(plain))
+        before = per_call(lambda: json.dumps(plain), args.repeat)
+        after = per_call(lambda: dumps(shared), args.repeat)
+        print(
+            f"{listed:>8}{before * 1e6:>15.1f}{after * 1e6:>17.1f}"
+            f"{before / after:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,452 @@
+"""
+Benchmark the full investigate pipeline and server.py offline.
+
+arXiv results are replayed from a recorded fixture (or synthetic papers when
+none is given), comparisons and listwise rankings are answered by a local
+chat-completions stand-in reached through the real compare_papers and
+LLMScheduler code, and summaries are streamed by a local Cerebras stand-in.
+The stand-ins answer deterministically from a hidden relevance score per
+title, with configurable latency and error rates, so runs are repeatable and
+need no network.
+
+Reports per-request latency of investigate at several paper pool sizes, the
+cost of a batch of related investigations run independently and through
+investigate_batch, then throughput and latency of the aiohttp server under
+concurrent load.
+
+Usage: python bench_pipeline.py [--pool-sizes 30 100 300] [--concurrency 1 8 32]
+       [--latency 0.05] [--arxiv-latency 1.0] [--error-rate 0.02]
+       [--fixture papers.json]
+       [--batch-topics 4] [--batch-questions 3]
+       python bench_pipeline.py --record "machine learning" --fixture papers.json
+"""
+
+import argparse
+import asyncio
+import atexit
+import datetime
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import tempfile
+import time
+import zlib
+from types import SimpleNamespace
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# Point the pipeline at the local stand-ins and switch off state that would
+# carry over between requests, before the backend modules read their settings.
+# Files the server writes go to a directory removed on exit
+MOCK_PORT = free_port()
+BENCH_DIR = tempfile.mkdtemp(prefix="bench_pipeline-")
+atexit.register(shutil.rmtree, BENCH_DIR, ignore_errors=True)
+os.environ.update(
+    {
+        "OPENAI_API_KEY": "bench",
+        "CEREBRAS_API_KEY": "bench",
+        "OPENAI_CHAT_URL": f"http://127.0.0.1:{MOCK_PORT}/v1/chat/completions",
+        "OPENAI_REQUESTS_PER_MINUTE": "10000000",
+        "OPENAI_TOKENS_PER_MINUTE": "10000000000",
+        "JUDGMENT_CACHE_PATH": "",
+        "SUMMARY_CACHE_PATH": "",
+        "PAPER_STORE_PATH": "",
+        "PAPER_HARVEST_INTERVAL": "0",
+        "INVESTIGATION_CACHE_TTL": "0",
+        "DIGEST_WARMUP_INTERVAL": "0",
+        "JOB_STORE_PATH": os.path.join(BENCH_DIR, "jobs.sqlite3"),
+        "PODCAST_AUDIO_DIR": os.path.join(BENCH_DIR, "podcast_audio"),
+        "TTS_CACHE_DIR": os.path.join(BENCH_DIR, "tts_cache"),
+    }
+)
+
+import aiohttp
+import numpy as np
+from aiohttp import web
+
+import arxiv_fetch
+import conductor
+import server
+from arxiv_fetch import fetch_window
+from metrics import get_metrics
+
+WORDS = (
+    "model neural data learning uncertainty network training results method "
+    "bayesian estimation calibration ensemble deep inference robust"
+).split()
+
+
+def relevance(title):
+    """
+    Hidden, deterministic relevance of a paper, from its title.
+    """
+    return float(np.exp(2.0 * ((zlib.crc32(title.encode()) % 10007) / 10007 - 0.5)))
+
+
+def synthetic_papers(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "title": f"Paper {i}: " + " ".join(rng.choice(WORDS, 8)),
+            "authors": ["A. Author", "B. Author"],
+            "summary": " ".join(rng.choice(WORDS, 200)),
+            "published": "2024-01-01",
+            "pdf_url": f"http://arxiv.org/pdf/{i}",
+            "entry_id": f"http://arxiv.org/abs/bench{i}",
+            "comment": None,
+            "doi": None,
+        }
+        for i in range(n)
+    ]
+
+
+def load_papers(path, n):
+    """
+    n papers from the recorded fixture, padded with synthetic ones if it is short.
+    """
+    papers = []
+    if path:
+        with open(path) as f:
+            papers = json.load(f)
+    return (papers + synthetic_papers(n))[:n]
+
+
+async def record_fixture(topic, path, days, max_results):
+    end = datetime.datetime.now(datetime.timezone.utc)
+    start = end - datetime.timedelta(days=days)
+    papers = await fetch_window(topic, start, end, max_results)
+    with open(path, "w") as f:
+        json.dump(papers, f, indent=1, default=dict)
+    print(f"Recorded {len(papers)} papers on {topic!r} to {path}")
+
+
+def make_chat_app(latency, error_rate, seed):
+    """
+    Chat-completions stand-in answering comparison and listwise prompts from
+    the hidden relevance of the titles in the prompt.
+    """
+    rng = random.Random(seed)
+    stats = {"requests": 0, "errors": 0}
+
+    async def completions(request):
+        stats["requests"] += 1
+        payload = await request.json()
+        prompt = payload["messages"][-1]["content"]
+        await asyncio.sleep(rng.expovariate(1 / latency) if latency > 0 else 0)
+        if rng.random() < error_rate:
+            stats["errors"] += 1
+            if rng.random() < 0.5:
+                return web.Response(status=429, headers={"Retry-After": "0.05"})
+            return web.Response(status=500, text="stand-in failure")
+
+        scores = [relevance(title) for title in re.findall(r"Title: (.*)", prompt)]
+        noisy = np.log(scores) + np.array([rng.gauss(0, 0.5) for _ in scores])
+        order = [int(i) + 1 for i in np.argsort(-noisy)]
+        answer = str(order[0]) if len(scores) == 2 else ", ".join(map(str, order))
+        tokens = len(prompt) // 4
+        return web.json_response(
+            {
+                "choices": [{"message": {"role": "assistant", "content": answer}}],
+                "usage": {
+                    "prompt_tokens": tokens,
+                    "completion_tokens": 3,
+                    "total_tokens": tokens + 3,
+                },
+            }
+        )
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    app["stats"] = stats
+    return app
+
+
+class MockCerebras:
+    """
+    AsyncCerebras stand-in streaming a fixed-length summary.
+    """
+
+    def __init__(self, latency, tokens=200):
+        self.latency = latency
+        self.tokens = tokens
+        self.chat = SimpleNamespace(completions=self)
+
+    async def create(self, messages, model, stream=False):
+        async def chunks():
+            # Time to first token, then a steady generation rate
+            await asyncio.sleep(self.latency)
+            for i in range(self.tokens):
+                if i % 20 == 0:
+                    await asyncio.sleep(0.001)
+                delta = SimpleNamespace(content=f"word{i} ")
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+        return chunks()
+
+    async def close(self):
+        pass
+
+
+def comparisons_counted():
+    return get_metrics().counters.get(("comparisons", ()), 0)
+
+
+def percentiles(values):
+    values = np.asarray(values)
+    return np.percentile(values, 50), np.percentile(values, 95), values.max()
+
+
+async def bench_pipeline(args, papers_by_size, cerebras):
+    print(
+        f"{'pool':>6}{'requests':>10}{'p50 s':>9}{'p95 s':>9}{'max s':>9}"
+        f"{'comparisons':>13}{'LLM calls':>11}"
+    )
+    async with aiohttp.ClientSession() as session:
+        for pool, papers in papers_by_size.items():
+            conductor.fetch_papers = replay(papers, args.arxiv_latency)
+            latencies = []
+            calls_before = args.chat_stats["requests"]
+            comparisons_before = comparisons_counted()
+            for i in range(args.trials):
+                start = time.perf_counter()
+                await investigate_once(
+                    session, cerebras, f"uncertainty estimation, run {pool}/{i}"
+                )
+                latencies.append(time.perf_counter() - start)
+            calls = (args.chat_stats["requests"] - calls_before) / args.trials
+            comparisons = (comparisons_counted() - comparisons_before) / args.trials
+            p50, p95, worst = percentiles(latencies)
+            print(
+                f"{pool:>6}{args.trials:>10}{p50:>9.3f}{p95:>9.3f}{worst:>9.3f}"
+                f"{comparisons:>13.1f}{calls:>11.1f}"
+            )
+
+
+async def investigate_once(session, cerebras, question):
+    result = await conductor.investigate(
+        {"topic": "bench", "time_frame": "year", "question": question},
+        session=session,
+        cerebras_client=cerebras,
+    )
+    if result.get("status") != "success":
+        raise RuntimeError(result.get("message"))
+    return result
+
+
+async def bench_batch(args, papers, cerebras):
+    """
+    A dashboard-style batch: every combination of a few topics and questions,
+    plus a repeat of each, run once as independent concurrent investigations
+    and once through investigate_batch.
+    """
+    items = [
+        {
+            "topic": f"bench topic {t}",
+            "time_frame": ("week", "month", "year")[t % 3],
+            "question": f"uncertainty estimation, batch question {q}",
+        }
+        for t in range(args.batch_topics)
+        for q in range(args.batch_questions)
+    ]
+    items += items[: len(items) // 4]
+    # Replay at the arXiv search level, so the per-topic paper cache is in play
+    searches = {"count": 0}
+    now = datetime.datetime.now(datetime.timezone.utc)
+    dated = [
+        (now - datetime.timedelta(hours=i), paper) for i, paper in enumerate(papers)
+    ]
+
+    async def search(query, max_results):
+        searches["count"] += 1
+        if args.arxiv_latency > 0:
+            await asyncio.sleep(args.arxiv_latency)
+        return list(dated)
+
+    arxiv_fetch._search_async = search
+    conductor.fetch_papers = arxiv_fetch.fetch_papers
+    print(
+        f"\n{'mode':>12}{'items':>7}{'wall s':>9}{'searches':>10}"
+        f"{'comparisons':>13}{'LLM calls':>11}"
+    )
+    async with aiohttp.ClientSession() as session:
+        for mode in ("independent", "batch"):
+            # Start cold: no earlier rankings to build on
+            conductor._ranking_states.clear()
+            arxiv_fetch._topic_cache.clear()
+            searches["count"] = 0
+            calls_before = args.chat_stats["requests"]
+            comparisons_before = comparisons_counted()
+            start = time.perf_counter()
+            if mode == "batch":
+                results = await conductor.investigate_batch(
+                    items, session=session, cerebras_client=cerebras
+                )
+            else:
+                results = await asyncio.gather(
+                    *(
+                        conductor.investigate(
+                            item, session=session, cerebras_client=cerebras
+                        )
+                        for item in items
+                    )
+                )
+            elapsed = time.perf_counter() - start
+            failed = sum(result.get("status") != "success" for result in results)
+            if failed:
+                raise RuntimeError(f"{failed} {mode} investigations failed")
+            print(
+                f"{mode:>12}{len(items):>7}{elapsed:>9.3f}{searches['count']:>10}"
+                f"{comparisons_counted() - comparisons_before:>13.0f}"
+                f"{args.chat_stats['requests'] - calls_before:>11}"
+            )
+
+
+def replay(papers, latency):
+    """
+    fetch_papers stand-in returning the recorded papers.
+    """
+
+    async def fetch_papers(topic, cutoff_date, max_results=None):
+        if latency > 0:
+            await asyncio.sleep(latency)
+        return list(papers)
+
+    return fetch_papers
+
+
+async def bench_server(args, papers_by_size, cerebras):
+    app = server.make_app()
+
+    async def use_mock_cerebras(app):
+        await app["cerebras"].close()
+        app["cerebras"] = cerebras
+
+    app.on_startup.append(use_mock_cerebras)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    port = free_port()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    url = f"http://127.0.0.1:{port}/responses"
+
+    print(
+        f"\n{'pool':>6}{'clients':>9}{'requests':>10}{'req/s':>9}{'p50 s':>9}"
+        f"{'p95 s':>9}{'max s':>9}{'errors':>8}"
+    )
+    try:
+        async with aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=0)
+        ) as session:
+            for pool, papers in papers_by_size.items():
+                conductor.fetch_papers = replay(papers, args.arxiv_latency)
+                for clients in args.concurrency:
+                    await load(session, url, pool, clients, args.server_requests)
+    finally:
+        await runner.cleanup()
+
+
+async def load(session, url, pool, clients, total):
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def client():
+        nonlocal errors
+        while not queue.empty():
+            i = queue.get_nowait()
+            # Distinct questions, so neither coalescing nor caching kicks in
+            params = {
+                "topic": "bench",
+                "time_frame": "year",
+                "question": f"uncertainty estimation, load {pool}/{clients}/{i}",
+            }
+            start = time.perf_counter()
+            async with session.get(url, params=params) as response:
+                body = await response.json()
+            latencies.append(time.perf_counter() - start)
+            if response.status != 200 or body.get("status") != "success":
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    p50, p95, worst = percentiles(latencies)
+    print(
+        f"{pool:>6}{clients:>9}{total:>10}{total / elapsed:>9.2f}{p50:>9.3f}"
+        f"{p95:>9.3f}{worst:>9.3f}{errors:>8}"
+    )
+
+
+async def run(args):
+    chat_app = make_chat_app(args.latency, args.error_rate, args.seed)
+    args.chat_stats = chat_app["stats"]
+    runner = web.AppRunner(chat_app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", MOCK_PORT).start()
+
+    np.random.seed(args.seed)
+    cerebras = MockCerebras(args.summary_latency)
+    papers_by_size = {n: load_papers(args.fixture, n) for n in args.pool_sizes}
+    try:
+        await bench_pipeline(args, papers_by_size, cerebras)
+        if args.batch_topics and args.batch_questions:
+            await bench_batch(args, papers_by_size[args.pool_sizes[0]], cerebras)
+        if not args.skip_server:
+            await bench_server(args, papers_by_size, cerebras)
+    finally:
+        await runner.cleanup()
+    print(
+        f"\nchat stand-in: {args.chat_stats['requests']} requests, "
+        f"{args.chat_stats['errors']} injected errors"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[30, 100, 300])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--server-requests", type=int, default=32)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="mean chat-completion latency"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--summary-latency", type=float, default=0.2)
+    parser.add_argument(
+        "--arxiv-latency", type=float, default=1.0, help="arXiv search latency"
+    )
+    parser.add_argument("--fixture", help="JSON list of recorded paper dicts")
+    parser.add_argument("--record", metavar="TOPIC", help="record a fixture and exit")
+    parser.add_argument("--record-days", type=int, default=30)
+    parser.add_argument("--record-max-results", type=int, default=300)
+    parser.add_argument("--batch-topics", type=int, default=4)
+    parser.add_argument("--batch-questions", type=int, default=3)
+    parser.add_argument("--skip-server", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.record:
+        if not args.fixture:
+            parser.error("--record needs --fixture to write to")
+        asyncio.run(
+            record_fixture(
+                args.record, args.fixture, args.record_days, args.record_max_results
+            )
+        )
+        return
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
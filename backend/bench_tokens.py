@@ -0,0 +1,122 @@
+"""
+Benchmark requests and input tokens per query for each ranking strategy.
+
+Prompts are built with the real conductor prompt builders on synthetic
+papers with 250-word abstracts, and answered by a simulated judge with known
+ground truth: pairwise answers follow Bradley-Terry probabilities and
+listwise answers are a Plackett-Luce sample from the hidden scores. A
+fraction of listwise answers can be made unparseable to exercise the
+pairwise fallback.
+
+Usage: python bench_tokens.py [--n 50] [--trials 20] [--parse-failure-rate 0.1]
+"""
+
+import argparse
+import asyncio
+import numpy as np
+
+from conductor import comparison_prompt, listwise_prompt, parse_ranking
+from llm_scheduler import estimate_tokens
+from ranking import RANKING_STRATEGIES, rank_pairwise
+
+WORDS = "model neural data learning uncertainty network training results method".split()
+
+
+def make_papers(n, rng):
+    return [
+        {
+            "title": f"Paper {i}: " + " ".join(rng.choice(WORDS, 8)),
+            "summary": " ".join(rng.choice(WORDS, 250)),
+            "entry_id": f"http://arxiv.org/abs/{i}",
+        }
+        for i in range(n)
+    ]
+
+
+async def run_trial(strategy, n, k, group_size, failure_rate, seed):
+    rng = np.random.default_rng(seed)
+    np.random.seed(seed)
+    papers = make_papers(n, rng)
+    question = "What are the latest advancements in uncertainty estimation?"
+    true_scores = np.exp(rng.normal(0, 2.0, n))
+    usage = {"requests": 0, "tokens": 0}
+
+    async def judge(i, j):
+        usage["requests"] += 1
+        usage["tokens"] += estimate_tokens(
+            comparison_prompt(papers[i], papers[j], question)
+        )
+        p = true_scores[i] / (true_scores[i] + true_scores[j])
+        return 1 if rng.random() < p else 2
+
+    async def group_judge(indices):
+        usage["requests"] += 1
+        usage["tokens"] += estimate_tokens(
+            listwise_prompt([papers[i] for i in indices], question)
+        )
+        if rng.random() < failure_rate:
+            answer = "I cannot decide."
+        else:
+            # Plackett-Luce sample: Gumbel noise on the log scores
+            noisy = np.log(true_scores[indices]) + rng.gumbel(size=len(indices))
+            answer = ", ".join(str(p + 1) for p in np.argsort(-noisy))
+        order = parse_ranking(answer, len(indices))
+        return None if order is None else [indices[p] for p in order]
+
+    _, scores = await rank_pairwise(
+        n,
+        judge,
+        strategy=strategy,
+        k=k,
+        group_judge=group_judge,
+        group_size=group_size,
+    )
+    true_top = set(np.argsort(-true_scores)[:k])
+    found_top = set(np.argsort(-scores)[:k])
+    return usage["requests"], usage["tokens"], len(true_top & found_top) / k
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, nargs="+", default=[50])
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--group-size", type=int, default=8)
+    parser.add_argument("--parse-failure-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--strategies", nargs="+", default=list(RANKING_STRATEGIES.keys())
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'strategy':<12}{'n':>6}{'requests':>11}{'input tokens':>15}"
+        f"{'vs exhaustive':>15}{'top-k overlap':>16}"
+    )
+    for n in args.n:
+        baseline = None
+        for strategy in args.strategies:
+            results = [
+                asyncio.run(
+                    run_trial(
+                        strategy,
+                        n,
+                        args.k,
+                        args.group_size,
+                        args.parse_failure_rate,
+                        seed,
+                    )
+                )
+                for seed in range(args.trials)
+            ]
+            requests, tokens, overlap = (np.mean(col) for col in zip(*results))
+            if strategy == "exhaustive":
+                baseline = tokens
+            ratio = f"{baseline / tokens:>14.1f}x" if baseline else f"{'-':>15}"
+            print(
+                f"{strategy:<12}{n:>6}{requests:>11.1f}{tokens:>15.0f}"
+                f"{ratio}{overlap:>16.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from prefilter import tokenize
+
+# Words of each abstract sent in ranking prompts; 0 sends the full abstract
+PROMPT_SUMMARY_WORDS = int(os.environ.get("PROMPT_SUMMARY_WORDS", 80))
+COMPACT_CACHE_SIZE = 20000
+
+_compact_cache = OrderedDict()
+_compact_cache_lock = threading.Lock()
+
+
+def split_sentences(text):
+    """
+    Split an abstract into sentences. Only a period, question or exclamation
+    mark followed by a space and a capital, digit or bracket ends a sentence,
+    so decimals and most abbreviations ("e.g. a") stay whole.
+    """
+    text = re.sub(r"\s+", " ", text or "").strip()
+    if not text:
+        return []
+    return re.split(r"(?<=[.!?])\s+(?=[A-Z0-9(\[])", text)
+
+
+def extract_sentences(text, max_words):
+    """
+    Shorten text to about max_words words by keeping its most central
+    sentences, in their original order.
+
+    Sentences are scored by the average in-abstract frequency of their terms,
+    so sentences restating the main topic win over background and boilerplate.
+    The first sentence is always kept since abstracts usually open with the
+    problem, then the most central ones are added until they reach
+    max_words. Put back in their original order, the kept sentences are
+    cut at max_words words, ending in " ...", so whichever of them comes
+    last in the abstract loses its tail.
+    """
+    sentences = split_sentences(text)
+    if max_words <= 0 or sum(len(s.split()) for s in sentences) <= max_words:
+        return " ".join(sentences)
+
+    frequency = Counter(tokenize(text))
+
+    def centrality(sentence):
+        terms = tokenize(sentence)
+        return sum(frequency[term] for term in terms) / (len(terms) + 1)
+
+    ranked = [0] + sorted(
+        range(1, len(sentences)), key=lambda i: -centrality(sentences[i])
+    )
+    kept, words = [], 0
+    for i in ranked:
+        if words >= max_words:
+            break
+        kept.append(i)
+        words += len(sentences[i].split())
+
+    compacted = " ".join(sentences[i] for i in sorted(kept)).split()
+    if len(compacted) > max_words:
+        return " ".join(compacted[:max_words]) + " ..."
+    return " ".join(compacted)
+
+
+def compact_summary(paper, max_words=PROMPT_SUMMARY_WORDS):
+    """
+    The paper's abstract shortened for ranking prompts, cached by entry_id so
+    each paper is compacted once however many comparisons it takes part in.
+    """
+    if max_words <= 0:
+        return paper["summary"]
+    key = (paper.get("entry_id"), max_words)
+    with _compact_cache_lock:
+        if key[0] is not None and key in _compact_cache:
+            _compact_cache.move_to_end(key)
+            return _compact_cache[key]
+    compacted = extract_sentences(paper["summary"], max_words)
+    if key[0] is not None:
+        with _compact_cache_lock:
+            _compact_cache[key] = compacted
+            if len(_compact_cache) > COMPACT_CACHE_SIZE:
+                _compact_cache.popitem(last=False)
+    return compacted
@@ -1,5 +1,5 @@
-import arxiv
 import datetime
+import hashlib
 import os
 import aiohttp
 import asyncio
@@ -7,27 +7,115 @@ import numpy as np
 from typing import List, Dict, Any
 import json
 import math
+import re
 import openai
-from cerebras.cloud.sdk import Cerebras
+from cerebras.cloud.sdk import AsyncCerebras, Cerebras
 import traceback
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from ranking import (
+    Budget,
+    bradley_terry_scores,
+    fit_scores,
+    incremental_rank,
+    rank_pairwise,
+)
+from judgment_cache import get_judgment_cache, normalize_question
+from investigation_cache import investigation_key
+from summary_cache import get_summary_cache, podcast_key, summary_key
+from dialogue import DialogueParser, parse_dialogue
+from llm_scheduler import estimate_tokens, get_openai_scheduler
+from prefilter import PREFILTER_TOP_M, prefilter_papers
+from compaction import PROMPT_SUMMARY_WORDS, compact_summary
+from papers import paper_record
+from arxiv_fetch import fetch_papers
+from paper_store import get_paper_store
+from metrics import get_metrics
 
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 CEREBRAS_API_KEY = os.environ.get("CEREBRAS_API_KEY")
-
-
-async def investigate(data):
+# "exhaustive" compares every pair, the others use O(n log n) comparisons.
+# "anytime" finds the true top 3 most often and stops once they are settled;
+# "swiss" plays a fixed schedule and is the least accurate of them
+RANKING_STRATEGY = os.environ.get("RANKING_STRATEGY", "anytime")
+# The "anytime" strategy stops once the top 3 are settled with this posterior
+# probability (see ranking.top_k_settled)
+RANKING_CONFIDENCE = float(os.environ.get("RANKING_CONFIDENCE", 0.9))
+# Default per-request ranking budget; unset means unlimited
+RANKING_BUDGET = {
+    "calls": os.environ.get("RANKING_BUDGET_CALLS"),
+    "tokens": os.environ.get("RANKING_BUDGET_TOKENS"),
+    "seconds": os.environ.get("RANKING_BUDGET_SECONDS"),
+}
+COMPARISON_MODEL = "gpt-3.5-turbo"
+# Papers per request for the batched "listwise" ranking strategy
+JUDGE_GROUP_SIZE = int(os.environ.get("JUDGE_GROUP_SIZE", 8))
+# Overridable so benchmarks can point the pipeline at a local stand-in
+OPENAI_CHAT_URL = os.environ.get(
+    "OPENAI_CHAT_URL", "https://api.openai.com/v1/chat/completions"
+)
+SUMMARY_MODEL = "llama-3.3-70b"
+# Part of the summary cache key; bump it whenever summary_prompt changes
+SUMMARY_PROMPT_VERSION = 1
+# Part of the podcast script cache key; bump it whenever podcast_prompt changes
+PODCAST_PROMPT_VERSION = 1
+# Start the summary once the running top 3 has not changed for this many
+# ranking rounds; 0 waits for the ranking to finish
+SUMMARY_SPECULATION_ROUNDS = int(os.environ.get("SUMMARY_SPECULATION_ROUNDS", 2))
+# Known opponents each new paper meets when it is added to an earlier ranking
+RANKING_ANCHORS = int(os.environ.get("RANKING_ANCHORS", 3))
+RANKING_STATES_SIZE = 256
+TTS_MODEL = "tts-1"
+# Podcast lines synthesized at the same time, and where finished lines are
+# cached by (voice, text); an empty TTS_CACHE_DIR disables the cache
+TTS_MAX_CONCURRENCY = int(os.environ.get("TTS_MAX_CONCURRENCY", 8))
+TTS_CACHE_DIR = os.environ.get("TTS_CACHE_DIR", "tts_cache")
+# Cached lines kept; the least recently used are deleted beyond this
+TTS_CACHE_MAX_FILES = int(os.environ.get("TTS_CACHE_MAX_FILES", 5000))
+# Where podcast audio is written; the server serves it under /podcast_audio
+PODCAST_AUDIO_DIR = os.environ.get("PODCAST_AUDIO_DIR", "podcast_audio")
+
+# Latest ranking state per normalized question, so repeat queries only rank
+# the papers that are new since the last run
+_ranking_states = OrderedDict()
+_ranking_states_lock = threading.Lock()
+
+
+async def investigate(
+    data, session=None, cerebras_client=None, progress=None, pending=None
+):
     """
     Search arXiv for papers on a specific topic within a given time frame.
+    A long-lived aiohttp session and AsyncCerebras client can be passed in so that
+    connections are reused across requests.
+
+    progress, if given, is a coroutine function awaited with events as the
+    pipeline advances: "candidates" once the papers are fetched, "ranking"
+    with the running top 3, "summary" with each piece of summary text and,
+    if a podcast was asked for, "podcast" with each line of the script (or
+    each audio file, for "audio").
+
+    pending is a dict shared by concurrent investigations (see
+    investigate_batch) so a pair of papers asked about the same question is
+    only judged once between them.
 
     Expected data format:
     {
         "topic": "machine learning",
         "time_frame": "week" | "month" | "year",
-        "question": "What are the latest advancements in uncertainty estimation in neural networks?"
+        "question": "What are the latest advancements in uncertainty estimation in neural networks?",
+        "budget": {"calls": 200, "tokens": 100000, "seconds": 30},  # optional
+        "podcast": "script" | "audio"  # optional
     }
 
-    Returns a list of papers with their details.
+    Returns a list of papers with their details. The "timing" field holds the
+    seconds spent in each stage of the pipeline.
     """
+    metrics = get_metrics()
+    timings = {}
+    started = time.perf_counter()
     try:
         if not OPENAI_API_KEY:
             return {
@@ -44,75 +132,139 @@ async def investigate(data):
         topic = data.get("topic", "")
         time_frame = data.get("time_frame", "week")
 
-        # Calculate the date based on time frame - make it timezone aware
-        today = datetime.datetime.now(datetime.timezone.utc)
-        if time_frame == "week":
-            cutoff_date = today - datetime.timedelta(days=7)
-        elif time_frame == "month":
-            cutoff_date = today - datetime.timedelta(days=30)
-        elif time_frame == "year":
-            cutoff_date = today - datetime.timedelta(days=365)
-        else:
-            # Default to one week if invalid time frame
-            cutoff_date = today - datetime.timedelta(days=7)
-            time_frame = "week"
+        cutoff_date, time_frame = time_window(time_frame)
 
-        # Create a client instead of using deprecated Search.results()
-        client = arxiv.Client()
+        with metrics.stage("fetch", timings):
+            papers = await find_papers(topic, cutoff_date)
 
-        # Set up the search query
-        search = arxiv.Search(
-            query=topic, max_results=50, sort_by=arxiv.SortCriterion.SubmittedDate
-        )
+        # If no question provided, use the topic as a fallback
+        question = data.get("question", f"Recent developments in {topic}")
+        # Only the candidates most similar to the question go to the LLM ranking
+        with metrics.stage("prefilter", timings):
+            candidates = prefilter_papers(papers, question, PREFILTER_TOP_M)
+        if progress is not None:
+            await progress(
+                {
+                    "event": "candidates",
+                    "papers_count": len(papers),
+                    "candidates": candidates,
+                }
+            )
 
-        # Process results
-        papers = []
-        # Use client.results() instead of search.results()
-        for result in client.results(search):
-            # Parse the publication date
-            pub_date = result.published
+        # Speculatively start the summary once the running top 3 settles, so it
+        # overlaps the tail of the ranking
+        speculation = {"ids": None, "stable_rounds": 0, "summary": None}
 
-            # Only include papers published after the cutoff date
-            if pub_date.replace(tzinfo=datetime.timezone.utc) >= cutoff_date:
-                papers.append(
-                    {
-                        "title": result.title,
-                        "authors": [author.name for author in result.authors],
-                        "summary": result.summary,
-                        "published": pub_date.strftime("%Y-%m-%d"),
-                        "pdf_url": result.pdf_url,
-                        "entry_id": result.entry_id,
-                        "comment": (
-                            result.comment if hasattr(result, "comment") else None
-                        ),
-                        "doi": result.doi if hasattr(result, "doi") else None,
-                    }
+        async def ranking_progress(event):
+            if progress is not None:
+                await progress(event)
+            ids = [paper["entry_id"] for paper in event["selected_papers"]]
+            if ids == speculation["ids"]:
+                speculation["stable_rounds"] += 1
+            else:
+                speculation.update(ids=ids, stable_rounds=0)
+                if speculation["summary"] is not None:
+                    speculation["summary"][0].cancel()
+                    speculation["summary"] = None
+            if (
+                SUMMARY_SPECULATION_ROUNDS
+                and speculation["summary"] is None
+                and speculation["stable_rounds"] >= SUMMARY_SPECULATION_ROUNDS
+            ):
+                speculation["summary"] = start_summary(
+                    event["selected_papers"], question, cerebras_client
                 )
 
-        # If no question provided, use the topic as a fallback
-        question = data.get("question", f"Recent developments in {topic}")
-        top_3_papers = await summary_filter(papers, question)
-        result_with_summary = get_summary(top_3_papers, question)
-        # podcast_data = get_podcast(result_with_summary, question)
-        # generate_podcast_audio_result = await generate_podcast_audio(podcast_data)
-        # top_3_papers["podcast_data"] = generate_podcast_audio_result
+        summary_task = None
+        try:
+            with metrics.stage("ranking", timings):
+                top_3_papers = await summary_filter(
+                    candidates,
+                    question,
+                    session=session,
+                    progress=ranking_progress,
+                    prior=get_ranking_state(question),
+                    budget=ranking_budget(data.get("budget")),
+                    pending=pending,
+                )
+            if top_3_papers.get("ranking_state") is not None:
+                save_ranking_state(question, top_3_papers["ranking_state"])
+            final_ids = [
+                paper["entry_id"] for paper in top_3_papers.get("selected_papers", [])
+            ]
+            if speculation["summary"] is not None and final_ids == speculation["ids"]:
+                summary_task, pieces = speculation["summary"]
+            else:
+                if speculation["summary"] is not None:
+                    speculation["summary"][0].cancel()
+                summary_task, pieces = start_summary(
+                    top_3_papers.get("selected_papers"), question, cerebras_client
+                )
+            # Only the part of the summary that did not overlap the ranking
+            with metrics.stage("summary", timings):
+                while (text := await pieces.get()) is not None:
+                    if progress is not None:
+                        await progress({"event": "summary", "text": text})
+                result_with_summary = await summary_task
+        finally:
+            # Never leave a summary running for a cancelled or failed request
+            for task in (summary_task, (speculation["summary"] or [None])[0]):
+                if task is not None and not task.done():
+                    task.cancel()
         print(result_with_summary)
-        return {
+
+        # The podcast is opt-in: "script" writes the dialogue, "audio" also
+        # speaks each line as soon as the streaming script reaches it
+        podcast = data.get("podcast")
+        podcast_data = None
+        if podcast and result_with_summary.get("status") != "error":
+
+            async def podcast_progress(entry, audio=None):
+                if progress is not None:
+                    await progress({"event": "podcast", **entry})
+
+            with metrics.stage("podcast", timings):
+                if podcast == "audio":
+                    podcast_data = await stream_podcast(
+                        result_with_summary,
+                        question,
+                        cerebras_client,
+                        on_segment=podcast_progress,
+                    )
+                else:
+                    podcast_data = await get_podcast_async(
+                        result_with_summary,
+                        question,
+                        cerebras_client,
+                        on_turn=podcast_progress,
+                    )
+
+        timings["total"] = round(time.perf_counter() - started, 6)
+        metrics.observe("stage_seconds", timings["total"], stage="total")
+        metrics.count("investigations", status="success")
+        result = {
             "status": "success",
             "topic": topic,
             "time_frame": time_frame,
             "papers_count": len(papers),
+            "candidates_ranked": len(candidates),
+            "token_usage": top_3_papers.get("token_usage"),
+            "budget_exhausted": top_3_papers.get("budget_exhausted", False),
             "selected_papers": top_3_papers.get(
                 "selected_papers", ["No papers selected"]
             ),
             "summary": result_with_summary.get("summary", ""),
             "question": question,
-            # "podcast_data": generate_podcast_audio_result
+            "timing": timings,
         }
+        if podcast_data is not None:
+            result["podcast_data"] = podcast_data
+        return result
 
     except Exception as e:
         import traceback
 
+        metrics.count("investigations", status="error")
         return {
             "status": "error",
             "message": str(e),
@@ -120,29 +272,216 @@ async def investigate(data):
         }
 
 
-async def compare_papers(
-    paper1: Dict, paper2: Dict, question: str, session: aiohttp.ClientSession
+def tidy_prompt(prompt: str):
+    """
+    Strip the indentation and surrounding blank lines of a prompt template,
+    which cost tokens without telling the model anything.
+    """
+    return "\n".join(line.strip() for line in prompt.strip().splitlines())
+
+
+def add_usage(usage, result):
+    """
+    Add the token counts a chat-completion result reports to the usage dict.
+    """
+    if usage is None:
+        return
+    reported = result.get("usage") or {}
+    usage["requests"] = usage.get("requests", 0) + 1
+    usage["input_tokens"] = usage.get("input_tokens", 0) + reported.get(
+        "prompt_tokens", 0
+    )
+    usage["output_tokens"] = usage.get("output_tokens", 0) + reported.get(
+        "completion_tokens", 0
+    )
+    metrics = get_metrics()
+    metrics.count("llm_tokens", reported.get("prompt_tokens", 0), kind="input")
+    metrics.count("llm_tokens", reported.get("completion_tokens", 0), kind="output")
+
+
+def comparison_prompt(
+    paper1: Dict, paper2: Dict, question: str, max_words=PROMPT_SUMMARY_WORDS
 ):
     """
-    Compare two papers based on their relevance to the provided question using OpenAI.
-    Returns 1 if paper1 is more relevant, 2 if paper2 is more relevant.
+    Prompt asking which of two papers is more relevant to the question.
+    Abstracts are compacted to about max_words words (0 keeps them whole).
     """
-    prompt = f"""
+    return tidy_prompt(f"""
     I need to determine which of these two scientific papers is more relevant to this specific question:
     
     QUESTION: {question}
     
     PAPER 1: 
     Title: {paper1['title']}
-    Summary: {paper1['summary']}
+    Summary: {compact_summary(paper1, max_words)}
     
     PAPER 2:
     Title: {paper2['title']}
-    Summary: {paper2['summary']}
+    Summary: {compact_summary(paper2, max_words)}
     
     Based solely on relevance to the question, which paper is more relevant?
     Respond with just the number 1 or 2.
+    """)
+
+
+def listwise_prompt(papers: List[Dict], question: str, max_words=PROMPT_SUMMARY_WORDS):
+    """
+    Prompt asking for a relevance ranking of several papers at once.
+    Abstracts are compacted to about max_words words (0 keeps them whole).
     """
+    paper_blocks = ""
+    for i, paper in enumerate(papers, 1):
+        paper_blocks += f"""
+    PAPER {i}:
+    Title: {paper['title']}
+    Summary: {compact_summary(paper, max_words)}
+    """
+    return tidy_prompt(f"""
+    I need to rank these {len(papers)} scientific papers by how relevant they are to this specific question:
+    
+    QUESTION: {question}
+    {paper_blocks}
+    Based solely on relevance to the question, rank all {len(papers)} papers from most to least relevant.
+    Respond with just the paper numbers separated by commas, for example: 3, 1, 2
+    """)
+
+
+def parse_ranking(answer: str, count: int):
+    """
+    Parse a listwise answer into 0-based positions ordered by relevance.
+    Repeated or out-of-range numbers are ignored and a single missing paper is
+    assumed to be last. Returns None if the answer does not rank every paper.
+    """
+    order = []
+    for token in re.findall(r"\d+", answer):
+        position = int(token) - 1
+        if 0 <= position < count and position not in order:
+            order.append(position)
+    if len(order) == count - 1:
+        order.extend(set(range(count)) - set(order))
+    return order if len(order) == count else None
+
+
+class SharedJudgment:
+    """
+    One comparison in flight in a pending dict and the budgets of the
+    rankings waiting on it (None for a ranking without one).
+
+    It is the budget its compare_papers call is charged to: the request is
+    sent unless every waiting budget is exhausted, and its cost is charged
+    to every ranking waiting then or joining later, as if each had sent it.
+    """
+
+    def __init__(self):
+        self.task = None
+        self.budgets = []
+        self.cost = None
+
+    def join(self, budget):
+        self.budgets.append(budget)
+        if budget is not None and self.cost is not None:
+            budget.spend(**self.cost)
+
+    def leave(self, budget):
+        self.budgets.remove(budget)
+
+    def exhausted(self):
+        return all(budget is not None and budget.exhausted() for budget in self.budgets)
+
+    def spend(self, calls=1, tokens=0):
+        self.cost = {"calls": calls, "tokens": tokens}
+        for budget in self.budgets:
+            if budget is not None:
+                budget.spend(calls, tokens)
+
+
+async def compare_papers(
+    paper1: Dict,
+    paper2: Dict,
+    question: str,
+    session: aiohttp.ClientSession,
+    cache=None,
+    fallback=True,
+    usage=None,
+    max_words=PROMPT_SUMMARY_WORDS,
+    pending=None,
+    budget=None,
+):
+    """
+    Compare two papers based on their relevance to the provided question using OpenAI.
+    Returns 1 if paper1 is more relevant, 2 if paper2 is more relevant.
+    If a JudgmentCache is given, previously judged pairs are answered from it and
+    new judgments from the API are stored in it (random fallbacks are not).
+    Requests go through the shared LLMScheduler, which retries rate limits. If no
+    real judgment could be made, a random winner is returned, or None when
+    fallback is False so the caller can tell the difference. The reported
+    input and output tokens are added to the usage dict, if given. Abstracts
+    are compacted to about max_words words.
+
+    budget is a ranking.Budget charged for the API request, if one is sent;
+    once it is exhausted no request is sent and the judgment fails. Cached
+    judgments are free.
+
+    pending is a dict of judgments in flight shared between concurrent
+    rankings: a pair someone else is already judging for the same question
+    waits for that answer instead of sending its own request. Every ranking
+    waiting on a shared judgment is charged for its request, so per-request
+    budgets count it however the work was shared (see SharedJudgment). A
+    shared judgment is cancelled once every ranking waiting on it has given
+    up.
+    """
+    if pending is not None:
+        first, second = sorted((paper1, paper2), key=lambda paper: paper["entry_id"])
+        key = (normalize_question(question), first["entry_id"], second["entry_id"])
+        judgment = pending.get(key)
+        if judgment is None:
+            judgment = pending[key] = SharedJudgment()
+            judgment.task = asyncio.ensure_future(
+                compare_papers(
+                    first,
+                    second,
+                    question,
+                    session,
+                    cache=cache,
+                    fallback=False,
+                    usage=usage,
+                    max_words=max_words,
+                    budget=judgment,
+                )
+            )
+        judgment.join(budget)
+        try:
+            # Shielded, so one ranking giving up does not fail the others
+            winner = await asyncio.shield(judgment.task)
+        finally:
+            judgment.leave(budget)
+            if not judgment.budgets and not judgment.task.done():
+                # Nobody wants the answer any more; a later ask starts afresh
+                if pending.get(key) is judgment:
+                    del pending[key]
+                judgment.task.cancel()
+        if winner is not None and first is not paper1:
+            winner = 3 - winner
+        if winner is None and fallback:
+            return np.random.choice([1, 2])
+        return winner
+
+    if cache is not None:
+        cached = await asyncio.to_thread(
+            cache.get,
+            question,
+            paper1["entry_id"],
+            paper2["entry_id"],
+            COMPARISON_MODEL,
+        )
+        if cached is not None:
+            return cached
+
+    prompt = comparison_prompt(paper1, paper2, question, max_words)
+    if budget is not None:
+        if budget.exhausted():
+            return np.random.choice([1, 2]) if fallback else None
+        budget.spend(tokens=estimate_tokens(prompt))
 
     headers = {
         "Content-Type": "application/json",
@@ -150,67 +489,318 @@ async def compare_papers(
     }
 
     data = {
-        "model": "gpt-3.5-turbo",
+        "model": COMPARISON_MODEL,
         "messages": [{"role": "user", "content": prompt}],
         "temperature": 0.3,
         "max_tokens": 10,
     }
 
     try:
-        async with session.post(
-            "https://api.openai.com/v1/chat/completions", headers=headers, json=data
-        ) as response:
-            if response.status == 200:
-                result = await response.json()
-                answer = result["choices"][0]["message"]["content"].strip()
-                # Extract just the number from the response
-                if "1" in answer:
-                    return 1
-                elif "2" in answer:
-                    return 2
-                else:
-                    # If unable to determine clearly, return randomly
-                    return np.random.choice([1, 2])
-            else:
-                # In case of API error, return randomly
-                print(f"API Error: {await response.text()}")
-                return np.random.choice([1, 2])
+        result = await get_openai_scheduler().post_json(
+            session,
+            OPENAI_CHAT_URL,
+            headers,
+            data,
+            tokens=estimate_tokens(prompt) + data["max_tokens"],
+        )
+        add_usage(usage, result)
+        answer = result["choices"][0]["message"]["content"].strip()
+        # Extract just the number from the response
+        winner = 1 if "1" in answer else 2 if "2" in answer else None
     except Exception as e:
         print(f"Error comparing papers: {e}")
+        winner = None
+
+    if winner is not None and cache is not None:
+        # Failures are logged by the cache, so a paid-for judgment is kept
+        await asyncio.to_thread(
+            cache.put,
+            question,
+            paper1["entry_id"],
+            paper2["entry_id"],
+            COMPARISON_MODEL,
+            winner,
+        )
+
+    if winner is None and fallback:
+        # If unable to determine clearly, return randomly
         return np.random.choice([1, 2])
+    return winner
 
 
-def bradley_terry_scores(win_matrix):
+async def rank_papers_listwise(
+    papers: List[Dict], question: str, session: aiohttp.ClientSession, usage=None
+):
     """
-    Compute the Bradley-Terry model scores from a win matrix.
-    This is a simple implementation using iterative approach.
+    Rank several papers by relevance to the question with a single OpenAI request.
+    Returns the 0-based positions of the papers from most to least relevant, or
+    None if the request failed or the answer could not be parsed. The reported
+    tokens are added to the usage dict, if given.
     """
-    n = len(win_matrix)
-    # Initialize scores
-    scores = np.ones(n)
+    prompt = listwise_prompt(papers, question)
 
-    # Iteratively update scores
-    for _ in range(10):  # 10 iterations usually sufficient for convergence
-        for i in range(n):
-            denom = 0
-            for j in range(n):
-                if i != j:
-                    denom += (win_matrix[i, j] + win_matrix[j, i]) / (
-                        scores[i] + scores[j]
-                    )
-            if denom > 0:
-                num = np.sum(win_matrix[i, :])
-                scores[i] = num / denom if num > 0 else scores[i]
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {OPENAI_API_KEY}",
+    }
 
-    # Normalize scores to sum to 1
-    return scores / np.sum(scores)
+    data = {
+        "model": COMPARISON_MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.3,
+        "max_tokens": 4 * len(papers) + 10,
+    }
 
+    try:
+        result = await get_openai_scheduler().post_json(
+            session,
+            OPENAI_CHAT_URL,
+            headers,
+            data,
+            tokens=estimate_tokens(prompt) + data["max_tokens"],
+        )
+        add_usage(usage, result)
+        answer = result["choices"][0]["message"]["content"]
+    except Exception as e:
+        print(f"Error ranking papers: {e}")
+        return None
 
-async def summary_filter(papers, question):
+    order = parse_ranking(answer, len(papers))
+    if order is None:
+        print(f"Could not parse listwise ranking: {answer!r}")
+    return order
+
+
+def top_papers_by_score(papers, scores, k=3):
+    """
+    Copies of the k best-scoring paper records, best first, with their
+    relevance_score.
+    """
+    # Get indices of top k papers by score
+    top_indices = np.argsort(scores)[-k:][::-1]
+
+    # Return top k papers with scores
+    top_papers = []
+    for idx in top_indices:
+        top_papers.append(paper_record(papers[idx]).scored(float(scores[idx])))
+    return top_papers
+
+
+def time_window(time_frame):
+    """
+    The timezone-aware cutoff date of a time frame, and the time frame itself,
+    which defaults to "week" when it is not one of week, month or year.
+    """
+    today = datetime.datetime.now(datetime.timezone.utc)
+    if time_frame == "week":
+        cutoff_date = today - datetime.timedelta(days=7)
+    elif time_frame == "month":
+        cutoff_date = today - datetime.timedelta(days=30)
+    elif time_frame == "year":
+        cutoff_date = today - datetime.timedelta(days=365)
+    else:
+        # Default to one week if invalid time frame
+        cutoff_date = today - datetime.timedelta(days=7)
+        time_frame = "week"
+    return cutoff_date, time_frame
+
+
+async def find_papers(topic, cutoff_date):
+    """
+    Papers on a topic published on or after cutoff_date.
+
+    Topics kept fresh by the harvester are answered from the local paper
+    store; otherwise fetch off the event loop, with the date window pushed
+    into the query and per-topic caching of earlier results.
+    """
+    metrics = get_metrics()
+    store = get_paper_store()
+    if store.covers(topic, cutoff_date):
+        metrics.count("paper_lookups", source="store")
+        return store.query(topic, cutoff_date)
+    metrics.count("paper_lookups", source="arxiv")
+    papers = await fetch_papers(topic, cutoff_date)
+    await asyncio.to_thread(store.add, papers)
+    # Ask the harvester to keep this topic fresh from now on
+    store.request(topic)
+    return papers
+
+
+async def prefetch_topics(items):
+    """
+    Fetch every distinct topic of a batch of investigate requests once,
+    reaching back to the earliest cutoff asked for. The investigations that
+    follow are then answered from the paper caches, which filter each one
+    down to its own time frame, instead of all searching arXiv at once.
+    """
+    earliest = {}
+    for data in items:
+        topic = data.get("topic", "")
+        cutoff_date, _ = time_window(data.get("time_frame", "week"))
+        key = topic.strip().lower()
+        if key not in earliest or cutoff_date < earliest[key][1]:
+            earliest[key] = (topic, cutoff_date)
+    results = await asyncio.gather(
+        *(find_papers(topic, cutoff_date) for topic, cutoff_date in earliest.values()),
+        return_exceptions=True,
+    )
+    for (topic, _), result in zip(earliest.values(), results):
+        if isinstance(result, Exception):
+            # The item's own investigation will report it
+            print(f"Error prefetching papers on {topic!r}: {result}")
+
+
+async def investigate_batch(items, session=None, cerebras_client=None, progress=None):
+    """
+    Run several investigations as one batch and return their results in order.
+
+    Each distinct topic is fetched once (prefetch_topics), identical items
+    (same normalized topic, time frame and question) run once and share their
+    result, and the investigations share a pending dict so a pair of papers
+    asked about the same question is judged once across the batch. All
+    comparisons go through the process-wide LLMScheduler on one session.
+
+    progress, if given, is awaited with every item's events, each tagged with
+    the "item" position it belongs to. Identical items get the events of the
+    one that ran.
+    """
+    owns_session = session is None
+    if owns_session:
+        session = aiohttp.ClientSession()
+    pending = {}
+    try:
+        with get_metrics().stage("batch_fetch"):
+            await prefetch_topics(items)
+
+        positions = {}
+        for position, data in enumerate(items):
+            positions.setdefault(investigation_key(data), []).append(position)
+
+        async def run(data, same):
+            async def item_progress(event):
+                for position in same:
+                    await progress({**event, "item": position})
+
+            return await investigate(
+                data,
+                session=session,
+                cerebras_client=cerebras_client,
+                progress=item_progress if progress is not None else None,
+                pending=pending,
+            )
+
+        groups = list(positions.values())
+        results = await asyncio.gather(*(run(items[same[0]], same) for same in groups))
+        ordered = [None] * len(items)
+        for same, result in zip(groups, results):
+            for position in same:
+                ordered[position] = result
+        get_metrics().count("batch_items", len(items))
+        return ordered
+    finally:
+        # Judgments nobody waits for any more, e.g. after a cancelled batch
+        running = [judgment.task for judgment in pending.values()]
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        if owns_session:
+            await session.close()
+
+
+def get_ranking_state(question):
+    """
+    The ranking state saved by the last summary_filter run for question.
+    """
+    with _ranking_states_lock:
+        state = _ranking_states.get(normalize_question(question))
+        if state is not None:
+            _ranking_states.move_to_end(normalize_question(question))
+        return state
+
+
+def save_ranking_state(question, state):
+    with _ranking_states_lock:
+        _ranking_states[normalize_question(question)] = state
+        _ranking_states.move_to_end(normalize_question(question))
+        if len(_ranking_states) > RANKING_STATES_SIZE:
+            _ranking_states.popitem(last=False)
+
+
+def seed_from_state(prior, papers):
+    """
+    Map a prior ranking state onto papers.
+    Returns (known, win_matrix, initial): the indices of papers ranked before,
+    the win matrix holding their earlier results, and warm-start strengths,
+    with papers new to the pool starting at the median known strength.
+    """
+    n = len(papers)
+    win_matrix = np.zeros((n, n))
+    initial = np.ones(n)
+    rows = {entry_id: row for row, entry_id in enumerate(prior["entry_ids"])}
+    known = [i for i, paper in enumerate(papers) if paper["entry_id"] in rows]
+    if known:
+        previous = [rows[papers[i]["entry_id"]] for i in known]
+        win_matrix[np.ix_(known, known)] = prior["win_matrix"][
+            np.ix_(previous, previous)
+        ]
+        strengths = np.asarray(prior["strengths"])[previous]
+        initial[:] = np.median(strengths)
+        initial[known] = strengths
+    return known, win_matrix, initial
+
+
+def ranking_budget(limits=None):
+    """
+    A ranking Budget from a {"calls", "tokens", "seconds"} dict, falling back
+    to the RANKING_BUDGET_* settings for limits that are not given.
+    """
+    limits = {**RANKING_BUDGET, **(limits or {})}
+    return Budget(
+        **{
+            name: None if value in (None, "") else float(value)
+            for name, value in limits.items()
+            if name in RANKING_BUDGET
+        }
+    )
+
+
+async def summary_filter(
+    papers,
+    question,
+    strategy=None,
+    session=None,
+    progress=None,
+    prior=None,
+    budget=None,
+    pending=None,
+):
     """
     Filter the list of papers based on the relevance to a specific question based on the feedback of OpenAI.
-    Compare each pairwise combination once of the papers asynchronously, then using the win matrix
-    run a Bradley-Terry model to get the top 3 scores.
+    Pairs of papers are compared asynchronously according to the ranking strategy
+    (see ranking.RANKING_STRATEGIES), then using the win matrix run a Bradley-Terry
+    model to get the top 3 scores. strategy="exhaustive" compares every pair once,
+    strategy="listwise" ranks groups of JUDGE_GROUP_SIZE papers per request.
+    Pass a long-lived aiohttp session to reuse its connection pool. If progress
+    is given, it is awaited with a "ranking" event holding the current top 3
+    after every round of comparisons.
+
+    prior is the "ranking_state" returned by an earlier call for the same
+    question: its entry_ids, win matrix, Bradley-Terry scores and strengths.
+    When most papers were ranked before, only the new ones are compared,
+    against a few anchors (ranking.incremental_rank), instead of re-ranking
+    the whole pool. That only happens when no strategy is passed and the
+    configured RANKING_STRATEGY is not "exhaustive".
+
+    budget is a ranking.Budget limiting the API calls, tokens and wall time
+    spent (default: the RANKING_BUDGET_* settings) with any strategy;
+    judgments answered from the cache are not charged. Once it is used up,
+    further judgments are skipped, comparisons still in flight when its
+    wall time runs out are cancelled, and the result has "budget_exhausted"
+    set. strategy="active" and "anytime" also stop as soon as the top 3 are
+    settled at RANKING_CONFIDENCE.
+
+    pending is passed on to compare_papers, to share judgments in flight
+    with concurrent rankings.
     """
     if not OPENAI_API_KEY:
         return {
@@ -222,72 +812,140 @@ async def summary_filter(papers, question):
         return {"status": "success", "selected_papers": papers}
 
     n = len(papers)
-    win_matrix = np.zeros((n, n))
-
-    # Create all pairwise combinations
-    comparisons = []
-    for i in range(n):
-        for j in range(i + 1, n):
-            comparisons.append((i, j))
-
-    # Execute comparisons asynchronously
-    async with aiohttp.ClientSession() as session:
-        tasks = []
-        for i, j in comparisons:
-            task = compare_papers(papers[i], papers[j], question, session)
-            tasks.append((i, j, asyncio.create_task(task)))
-
-        # Await all comparison results
-        for i, j, task in tasks:
-            try:
-                winner = await task
-                if winner == 1:
-                    win_matrix[i, j] += 1
-                else:
-                    win_matrix[j, i] += 1
-            except Exception as e:
-                print(f"Error in comparison task: {e}")
-                # If comparison fails, randomly assign winner
-                winner = np.random.choice([i, j])
-                win_matrix[winner, winner ^ i ^ j] += 1
-
-    # Calculate Bradley-Terry scores
-    scores = bradley_terry_scores(win_matrix)
+    requested = strategy
+    strategy = strategy or RANKING_STRATEGY
+    if budget is None:
+        budget = ranking_budget()
+    # Pairs judged before for this question are answered without an API call
+    cache = get_judgment_cache()
+    fallbacks = 0
+    comparisons = 0
+    listwise_requests = 0
+    usage = {"requests": 0, "input_tokens": 0, "output_tokens": 0}
+
+    # Execute comparisons asynchronously, on the caller's session if given
+    owns_session = session is None
+    if owns_session:
+        session = aiohttp.ClientSession()
+    try:
 
-    # Get indices of top 3 papers by score
-    top_indices = np.argsort(scores)[-3:][::-1]
+        async def judge(i, j):
+            nonlocal fallbacks, comparisons
+            comparisons += 1
+            # Failed judgments come back as None and are left out of the win matrix
+            winner = await compare_papers(
+                papers[i],
+                papers[j],
+                question,
+                session,
+                cache=cache,
+                fallback=False,
+                usage=usage,
+                pending=pending,
+                budget=budget,
+            )
+            if winner is None:
+                fallbacks += 1
+            return winner
+
+        async def group_judge(indices):
+            nonlocal fallbacks, listwise_requests
+            group = [papers[i] for i in indices]
+            if budget.exhausted():
+                return None
+            budget.spend(tokens=estimate_tokens(listwise_prompt(group, question)))
+            listwise_requests += 1
+            order = await rank_papers_listwise(group, question, session, usage=usage)
+            if order is None:
+                fallbacks += 1
+                return None
+            return [indices[position] for position in order]
+
+        async def on_round(win_matrix):
+            if progress is not None:
+                await progress(
+                    {
+                        "event": "ranking",
+                        "selected_papers": top_papers_by_score(
+                            papers, fit_scores(win_matrix)["scores"]
+                        ),
+                        "comparisons_used": comparisons,
+                    }
+                )
 
-    # Return top 3 papers with scores
-    top_papers = []
-    for idx in top_indices:
-        paper = papers[idx].copy()
-        paper["relevance_score"] = float(scores[idx])
-        top_papers.append(paper)
+        known = []
+        if prior is not None:
+            known, win_matrix, initial = seed_from_state(prior, papers)
+        # Incremental re-ranking pays off while the known papers dominate,
+        # unless the caller chose a strategy or every pair is to be compared
+        incremental = requested is None and strategy != "exhaustive"
+        if incremental and len(known) >= max(6, n / 2):
+            strategy = "incremental"
+            await incremental_rank(
+                n,
+                judge,
+                known,
+                k=3,
+                win_matrix=win_matrix,
+                initial=initial,
+                anchors=RANKING_ANCHORS,
+                budget=budget,
+                on_round=on_round,
+            )
+            with get_metrics().stage("bradley_terry"):
+                fit = fit_scores(win_matrix, previous={"strengths": initial})
+            scores = fit["scores"]
+        else:
+            options = {"budget": budget}
+            if strategy in ("active", "anytime"):
+                options.update(confidence=RANKING_CONFIDENCE)
+            win_matrix, scores = await rank_pairwise(
+                n,
+                judge,
+                strategy=strategy,
+                k=3,
+                group_judge=group_judge,
+                group_size=JUDGE_GROUP_SIZE,
+                on_round=on_round,
+                **options,
+            )
+            fit = fit_scores(win_matrix)
+    finally:
+        if owns_session:
+            await session.close()
+
+    top_papers = top_papers_by_score(papers, scores)
+    metrics = get_metrics()
+    metrics.count("rankings", strategy=strategy)
+    metrics.count("comparisons", comparisons)
+    metrics.count("listwise_requests", listwise_requests)
+    metrics.count("failed_comparisons", fallbacks)
 
     return {
         "status": "success",
         "selected_papers": top_papers,
         "total_papers_analyzed": len(papers),
+        "comparisons_used": comparisons,
+        "listwise_requests": listwise_requests,
+        "failed_comparisons": fallbacks,
+        "ranking_strategy": strategy,
+        "budget_used": budget.used(),
+        "budget_exhausted": budget.exhausted(),
+        "token_usage": usage,
+        "judgment_cache": cache.stats() if cache is not None else None,
+        "ranking_state": {
+            "entry_ids": [paper["entry_id"] for paper in papers],
+            "win_matrix": win_matrix,
+            "scores": scores,
+            "strengths": fit["strengths"],
+        },
     }
 
 
-def get_summary(top_3_papers, question=None):
+def summary_prompt(papers, question=None):
     """
-    Get the summary of the top 3 papers using Cerebras API and the llama-3.3-70b model.
+    Prompt asking llama-3.3-70b to summarize the selected papers.
     """
-    if not CEREBRAS_API_KEY:
-        return {
-            "status": "error",
-            "message": "Cerebras API key not found in environment variables",
-        }
-
-    if not top_3_papers or "selected_papers" not in top_3_papers:
-        return {"status": "error", "message": "No papers provided for summarization"}
-
-    papers = top_3_papers["selected_papers"]
-    if not papers:
-        return {"status": "error", "message": "Empty paper list"}
-
     # Create formatted text for each paper
     paper_summaries = []
     for i, paper in enumerate(papers, 1):
@@ -326,20 +984,72 @@ Please provide:
 3. What are the most important implications of these papers for future research?
 4. Any limitations or gaps in the current research based on these papers
 """
+    return prompt
+
+
+def cached_summary(papers, question):
+    """
+    Look up the synthesis of papers for question in the summary cache.
+    Returns (key, summary); summary is None on a miss and key is None when
+    the cache is disabled.
+    """
+    cache = get_summary_cache()
+    if cache is None:
+        return None, None
+    key = summary_key(papers, question, SUMMARY_MODEL, SUMMARY_PROMPT_VERSION)
+    summary = cache.get(key)
+    get_metrics().count("summary_cache", result="miss" if summary is None else "hit")
+    return key, summary
+
+
+def store_summary(key, summary):
+    if key is not None and summary:
+        get_summary_cache().put(key, summary)
+
+
+def get_summary(top_3_papers, question=None, client=None):
+    """
+    Get the summary of the top 3 papers using Cerebras API and the llama-3.3-70b model.
+    Pass a shared Cerebras client to avoid building a new one for every call.
+    This call blocks; get_summary_async is the event-loop friendly version.
+    """
+    if not CEREBRAS_API_KEY:
+        return {
+            "status": "error",
+            "message": "Cerebras API key not found in environment variables",
+        }
+
+    if not top_3_papers or "selected_papers" not in top_3_papers:
+        return {"status": "error", "message": "No papers provided for summarization"}
+
+    papers = top_3_papers["selected_papers"]
+    if not papers:
+        return {"status": "error", "message": "Empty paper list"}
+
+    # The same papers and question were summarized recently
+    key, summary_text = cached_summary(papers, question)
+    if summary_text is not None:
+        top_3_papers["summary"] = summary_text
+        top_3_papers["question"] = question
+        return top_3_papers
+
+    prompt = summary_prompt(papers, question)
 
     try:
-        # Initialize Cerebras client
-        client = Cerebras(
-            api_key=CEREBRAS_API_KEY,
-        )
+        # Initialize Cerebras client unless the caller shares one
+        if client is None:
+            client = Cerebras(
+                api_key=CEREBRAS_API_KEY,
+            )
 
         # Call the Cerebras API
         response = client.chat.completions.create(
             messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b",
+            model=SUMMARY_MODEL,
         )
         # Extract the generated text
         summary_text = response.choices[0].message.content
+        store_summary(key, summary_text)
 
         # Update the top_3_papers with the summary
         top_3_papers["summary"] = summary_text
@@ -358,12 +1068,12 @@ Please provide:
         }
 
 
-def get_podcast(top_3_papers, question=None):
+async def get_summary_async(top_3_papers, question=None, client=None, on_token=None):
     """
-    Generate a podcast script between two people discussing research papers.
-    Uses Cerebras API to generate the dialogue content.
-
-    Returns a dictionary with the podcast script and individual speaker lines.
+    Async, streaming version of get_summary.
+    Uses a shared AsyncCerebras client if given, so the event loop is never
+    blocked, and awaits on_token with each piece of text as it is generated.
+    A cached summary is passed to on_token in one piece.
     """
     if not CEREBRAS_API_KEY:
         return {
@@ -372,12 +1082,83 @@ def get_podcast(top_3_papers, question=None):
         }
 
     if not top_3_papers or "selected_papers" not in top_3_papers:
-        return {"status": "error", "message": "No papers provided for podcast creation"}
+        return {"status": "error", "message": "No papers provided for summarization"}
 
     papers = top_3_papers["selected_papers"]
     if not papers:
         return {"status": "error", "message": "Empty paper list"}
 
+    key, summary_text = await asyncio.to_thread(cached_summary, papers, question)
+    if summary_text is not None:
+        if on_token is not None:
+            await on_token(summary_text)
+        top_3_papers["summary"] = summary_text
+        top_3_papers["question"] = question
+        return top_3_papers
+
+    prompt = summary_prompt(papers, question)
+    owns_client = client is None
+    try:
+        if owns_client:
+            client = AsyncCerebras(api_key=CEREBRAS_API_KEY)
+
+        stream = await client.chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            model=SUMMARY_MODEL,
+            stream=True,
+        )
+        pieces = []
+        async for chunk in stream:
+            usage = getattr(chunk, "usage", None)
+            if usage is not None and usage.total_tokens:
+                get_metrics().count(
+                    "llm_tokens", usage.total_tokens, model=SUMMARY_MODEL
+                )
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                pieces.append(text)
+                if on_token is not None:
+                    await on_token(text)
+
+        top_3_papers["summary"] = "".join(pieces)
+        top_3_papers["question"] = question
+        await asyncio.to_thread(store_summary, key, top_3_papers["summary"])
+        return top_3_papers
+
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Error generating summary: {str(e)}",
+            "traceback": traceback.format_exc(),
+            "papers": top_3_papers["selected_papers"],
+        }
+    finally:
+        if owns_client and client is not None:
+            await client.close()
+
+
+def start_summary(papers, question, client=None):
+    """
+    Start generating a summary of papers in the background.
+    Returns (task, pieces): the task resolves to the get_summary_async result
+    and pieces is a queue of the generated text, ending with None.
+    """
+    pieces = asyncio.Queue()
+
+    async def on_token(text):
+        pieces.put_nowait(text)
+
+    task = asyncio.create_task(
+        get_summary_async({"selected_papers": papers}, question, client, on_token)
+    )
+    task.add_done_callback(lambda _: pieces.put_nowait(None))
+    return task, pieces
+
+
+def podcast_prompt(papers, summary, question=None):
+    """
+    Prompt asking llama-3.3-70b for a podcast script about the selected papers.
+    """
     # Create formatted text for each paper
     paper_summaries = []
     for i, paper in enumerate(papers, 1):
@@ -393,9 +1174,6 @@ def get_podcast(top_3_papers, question=None):
     # Join all paper summaries with separators
     papers_text = "\n\n" + "\n\n".join(paper_summaries) + "\n\n"
 
-    # Get the summary if it exists
-    summary = top_3_papers.get("summary", "")
-
     # Create prompt for podcast generation
     prompt = f"""You are a world-class podcast producer tasked with transforming the provided input text into an engaging and informative podcast script. The input may be unstructured or messy, sourced from PDFs or web pages. Your goal is to extract the most interesting and insightful content for a compelling podcast discussion.
 
@@ -433,10 +1211,77 @@ Please output the podcast script as a JSON array with each element containing:
 
 For example:
 [
-  {"speaker": "Jane", "text": "Welcome to the Science Express podcast! Today we're discussing quantum computing."},
-  {"speaker": "Alex", "text": "Thanks, Jane. I'm excited to dive into this fascinating topic."}
+  {{"speaker": "Jane", "text": "Welcome to the Science Express podcast! Today we're discussing quantum computing."}},
+  {{"speaker": "Alex", "text": "Thanks, Jane. I'm excited to dive into this fascinating topic."}}
 ]
 """
+    return prompt
+
+
+def podcast_result(podcast_json, question):
+    """
+    The get_podcast result for a parsed script.
+    """
+    # Separate dialogue by speaker for potential voice synthesis
+    jane_lines = [item["text"] for item in podcast_json if item["speaker"] == "Jane"]
+    alex_lines = [item["text"] for item in podcast_json if item["speaker"] == "Alex"]
+
+    return {
+        "status": "success",
+        "podcast": podcast_json,
+        "jane_lines": jane_lines,
+        "alex_lines": alex_lines,
+        "question": question,
+    }
+
+
+def cached_podcast(papers, summary, question):
+    """
+    Look up the script for papers, summary and question in the summary cache.
+    Returns (key, turns); turns is None on a miss and key is None when the
+    cache is disabled.
+    """
+    cache = get_summary_cache()
+    if cache is None:
+        return None, None
+    key = podcast_key(papers, summary, question, SUMMARY_MODEL, PODCAST_PROMPT_VERSION)
+    script = cache.get(key)
+    get_metrics().count("podcast_cache", result="miss" if script is None else "hit")
+    return key, json.loads(script) if script is not None else None
+
+
+def store_podcast(key, turns):
+    if key is not None and turns:
+        get_summary_cache().put(key, json.dumps(turns))
+
+
+def get_podcast(top_3_papers, question=None):
+    """
+    Generate a podcast script between two people discussing research papers.
+    Uses Cerebras API to generate the dialogue content. This call blocks;
+    get_podcast_async is the streaming, event-loop friendly version.
+
+    Returns a dictionary with the podcast script and individual speaker lines.
+    """
+    if not CEREBRAS_API_KEY:
+        return {
+            "status": "error",
+            "message": "Cerebras API key not found in environment variables",
+        }
+
+    if not top_3_papers or "selected_papers" not in top_3_papers:
+        return {"status": "error", "message": "No papers provided for podcast creation"}
+
+    papers = top_3_papers["selected_papers"]
+    if not papers:
+        return {"status": "error", "message": "Empty paper list"}
+
+    summary = top_3_papers.get("summary", "")
+    key, podcast_json = cached_podcast(papers, summary, question)
+    if podcast_json is not None:
+        return podcast_result(podcast_json, question)
+
+    prompt = podcast_prompt(papers, summary, question)
 
     try:
         # Initialize Cerebras client
@@ -456,57 +1301,98 @@ For example:
         # Extract the generated text
         podcast_text = response.text if hasattr(response, "text") else str(response)
 
-        # Try to parse as JSON, if not, return raw text
-        try:
-            # Find JSON array in the response
-            import re
-
-            json_match = re.search(r"\[\s*\{.*\}\s*\]", podcast_text, re.DOTALL)
-            if json_match:
-                podcast_json = json.loads(json_match.group(0))
-            else:
-                # If no valid JSON found, try to process the text into a structured format
-                lines = podcast_text.split("\n")
-                podcast_json = []
-                current_speaker = None
-
-                for line in lines:
-                    line = line.strip()
-                    if line.startswith("Jane:"):
-                        current_speaker = "Jane"
-                        text = line[5:].strip()
-                        podcast_json.append({"speaker": current_speaker, "text": text})
-                    elif line.startswith("Alex:"):
-                        current_speaker = "Alex"
-                        text = line[5:].strip()
-                        podcast_json.append({"speaker": current_speaker, "text": text})
-                    elif current_speaker and line:
-                        # Continue previous speaker's line
-                        podcast_json.append({"speaker": current_speaker, "text": line})
-
-            # Separate dialogue by speaker for potential voice synthesis
-            jane_lines = [
-                item["text"] for item in podcast_json if item["speaker"] == "Jane"
-            ]
-            alex_lines = [
-                item["text"] for item in podcast_json if item["speaker"] == "Alex"
-            ]
-
+        # A JSON array of turns, or "Jane: ..." lines
+        podcast_json = parse_dialogue(podcast_text)
+        if not podcast_json:
+            # Return raw text if no dialogue could be found
             return {
                 "status": "success",
-                "podcast": podcast_json,
-                "jane_lines": jane_lines,
-                "alex_lines": alex_lines,
+                "podcast_text": podcast_text,
                 "question": question,
             }
+        store_podcast(key, podcast_json)
+        return podcast_result(podcast_json, question)
+
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Error generating podcast: {str(e)}",
+            "traceback": traceback.format_exc(),
+        }
+
+
+async def get_podcast_async(top_3_papers, question=None, client=None, on_turn=None):
+    """
+    Async, streaming version of get_podcast.
+    Uses a shared AsyncCerebras client if given and parses the script as it
+    is generated, awaiting on_turn with each {"speaker", "text"} turn as soon
+    as it is complete. Scripts are cached by the selected papers, the summary
+    and the question; a cached script is passed to on_turn turn by turn.
+    """
+    if not CEREBRAS_API_KEY:
+        return {
+            "status": "error",
+            "message": "Cerebras API key not found in environment variables",
+        }
+
+    if not top_3_papers or "selected_papers" not in top_3_papers:
+        return {"status": "error", "message": "No papers provided for podcast creation"}
+
+    papers = top_3_papers["selected_papers"]
+    if not papers:
+        return {"status": "error", "message": "Empty paper list"}
+
+    summary = top_3_papers.get("summary", "")
+    key, podcast_json = await asyncio.to_thread(
+        cached_podcast, papers, summary, question
+    )
+    if podcast_json is not None:
+        if on_turn is not None:
+            for turn in podcast_json:
+                await on_turn(turn)
+        return podcast_result(podcast_json, question)
+
+    prompt = podcast_prompt(papers, summary, question)
+    owns_client = client is None
+    parser = DialogueParser()
+    try:
+        if owns_client:
+            client = AsyncCerebras(api_key=CEREBRAS_API_KEY)
 
-        except json.JSONDecodeError:
-            # Return raw text if JSON parsing fails
+        stream = await client.chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            model=SUMMARY_MODEL,
+            stream=True,
+            temperature=0.7,  # Higher temperature for creativity
+            max_tokens=3000,
+            top_p=0.9,
+        )
+        pieces = []
+        async for chunk in stream:
+            usage = getattr(chunk, "usage", None)
+            if usage is not None and usage.total_tokens:
+                get_metrics().count(
+                    "llm_tokens", usage.total_tokens, model=SUMMARY_MODEL
+                )
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                pieces.append(text)
+                for turn in parser.feed(text):
+                    if on_turn is not None:
+                        await on_turn(turn)
+        for turn in parser.finish():
+            if on_turn is not None:
+                await on_turn(turn)
+
+        if not parser.turns:
+            # Return raw text if no dialogue could be found
             return {
                 "status": "success",
-                "podcast_text": podcast_text,
+                "podcast_text": "".join(pieces),
                 "question": question,
             }
+        await asyncio.to_thread(store_podcast, key, parser.turns)
+        return podcast_result(parser.turns, question)
 
     except Exception as e:
         return {
@@ -514,14 +1400,139 @@ For example:
             "message": f"Error generating podcast: {str(e)}",
             "traceback": traceback.format_exc(),
         }
+    finally:
+        if owns_client and client is not None:
+            await client.close()
+
+
+async def stream_podcast(
+    top_3_papers, question=None, client=None, stitch=False, on_segment=None
+):
+    """
+    Generate the podcast script and its audio together: each line goes to
+    text-to-speech as soon as it is parsed from the streaming script, rather
+    than once the whole script is written.
+
+    Returns the get_podcast_async result with the generate_podcast_audio
+    result under "audio".
+    """
+    turns = asyncio.Queue()
+
+    async def on_turn(turn):
+        turns.put_nowait(turn)
+
+    script = asyncio.create_task(
+        get_podcast_async(top_3_papers, question, client, on_turn)
+    )
+    script.add_done_callback(lambda _: turns.put_nowait(None))
+
+    async def lines():
+        while (turn := await turns.get()) is not None:
+            yield turn
+
+    try:
+        audio = await generate_podcast_audio({"podcast": lines()}, stitch, on_segment)
+        podcast = await script
+    finally:
+        if not script.done():
+            script.cancel()
+    if podcast.get("status") != "success":
+        return podcast
+    return {**podcast, "audio": audio}
+
+
+def tts_cache_path(voice, text):
+    """
+    Cache file for the speech of text in voice, or None if caching is off.
+    """
+    if not TTS_CACHE_DIR:
+        return None
+    key = hashlib.sha256(f"{TTS_MODEL}\0{voice}\0{text}".encode()).hexdigest()
+    return os.path.join(TTS_CACHE_DIR, f"{key}.mp3")
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _read_cached(path):
+    # Mark the file as recently used, so pruning keeps it
+    os.utime(path)
+    return _read_file(path)
+
+
+def prune_tts_cache(max_files=TTS_CACHE_MAX_FILES):
+    """
+    Delete the least recently used lines in TTS_CACHE_DIR once it holds more
+    than max_files, down to 90% so it is not pruned again on every podcast.
+    """
+    try:
+        entries = [
+            entry for entry in os.scandir(TTS_CACHE_DIR) if entry.name.endswith(".mp3")
+        ]
+    except FileNotFoundError:
+        return
+    if len(entries) <= max_files:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in entries[: len(entries) - int(max_files * 0.9)]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def _write_file(path, data, mode="wb"):
+    with open(path, mode) as f:
+        f.write(data)
 
 
-async def generate_podcast_audio(podcast_data):
+async def synthesize_speech(client, voice, text, semaphore):
+    """
+    MP3 audio of text spoken in voice. Lines synthesized before, such as
+    intros and outros, are read from the TTS cache instead.
+    """
+    path = tts_cache_path(voice, text)
+    if path is not None and os.path.exists(path):
+        try:
+            return await asyncio.to_thread(_read_cached, path)
+        except FileNotFoundError:
+            # Pruned since the check; synthesize it again
+            pass
+    async with semaphore:
+        response = await client.audio.speech.create(
+            model=TTS_MODEL, voice=voice, input=text
+        )
+    audio = response.content
+    if path is not None:
+        # Write to a temporary name so a concurrent reader never sees half a
+        # file; it is unique so concurrent podcasts saying the same line in
+        # this process do not write to the same one
+        temporary = f"{path}.{uuid.uuid4().hex}.tmp"
+        await asyncio.to_thread(_write_file, temporary, audio)
+        os.replace(temporary, path)
+    return audio
+
+
+async def generate_podcast_audio(podcast_data, stitch=False, on_segment=None):
     """
     Generate audio for podcast dialogue using OpenAI's Text-to-Speech API.
 
+    Lines are synthesized concurrently, at most TTS_MAX_CONCURRENCY at a time,
+    but written out in script order as soon as each one and all lines before
+    it are ready. Identical lines are synthesized once, and files are written
+    off the event loop. One OpenAI client is used for all of them and closed
+    at the end, and the TTS cache is pruned to TTS_CACHE_MAX_FILES first.
+
     Parameters:
-    - podcast_data: Output from get_podcast function with speaker lines
+    - podcast_data: Output from get_podcast function with speaker lines; its
+      "podcast" lines can also be an async iterable yielding them as the
+      script is generated (see stream_podcast)
+    - stitch: Also append every segment, in order, to one MP3 file that can be
+      played while the rest is still being synthesized
+    - on_segment: Optional coroutine function awaited with each audio_files
+      entry and its MP3 bytes, in order, e.g. to stream the audio
 
     Returns:
     - Dictionary with audio file paths
@@ -535,17 +1546,21 @@ async def generate_podcast_audio(podcast_data):
     if "podcast" not in podcast_data:
         return {"status": "error", "message": "No podcast script found in data"}
 
+    tasks = {}
+    reader = None
+    client = None
     try:
-        import openai
-        import os
         from datetime import datetime
 
         # Configure OpenAI client
-        openai.api_key = OPENAI_API_KEY
+        client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
 
         # Create output directory
-        output_dir = os.path.join(os.getcwd(), "podcast_audio")
+        output_dir = os.path.abspath(PODCAST_AUDIO_DIR)
         os.makedirs(output_dir, exist_ok=True)
+        if TTS_CACHE_DIR:
+            os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+            await asyncio.to_thread(prune_tts_cache)
 
         # Generate a unique identifier for this podcast
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -554,43 +1569,73 @@ async def generate_podcast_audio(podcast_data):
         # Define voice settings
         voices = {"Jane": "nova", "Alex": "onyx"}  # Female voice  # Male voice
 
-        # Process each line in the podcast
-        audio_files = []
-        full_script = []
-
-        for i, line in enumerate(podcast_data["podcast"]):
-            speaker = line["speaker"]
-            text = line["text"]
+        # Start synthesizing every line as soon as it is known; repeated lines
+        # share a task
+        semaphore = asyncio.Semaphore(TTS_MAX_CONCURRENCY)
+        segments = asyncio.Queue()
 
-            # Skip empty lines
-            if not text.strip():
-                continue
+        async def read_script():
+            try:
+                i = 0
+                async for line in script_lines(podcast_data["podcast"]):
+                    speaker = line["speaker"]
+                    text = line["text"]
+
+                    # Skip empty lines
+                    if text.strip():
+                        key = (voices[speaker], text)
+                        if key not in tasks:
+                            tasks[key] = asyncio.create_task(
+                                synthesize_speech(
+                                    client, voices[speaker], text, semaphore
+                                )
+                            )
+                        segments.put_nowait((i, speaker, text, tasks[key]))
+                    i += 1
+            finally:
+                segments.put_nowait(None)
+
+        reader = asyncio.create_task(read_script())
+
+        # Full text script, and the stitched audio if asked for
+        full_script = []
+        stitched_path = None
+        if stitch:
+            stitched_path = os.path.join(output_dir, f"{podcast_id}.mp3")
+            await asyncio.to_thread(_write_file, stitched_path, b"")
 
-            # Append to full script
+        # Save the audio files in script order as they become ready
+        audio_files = []
+        while (segment := await segments.get()) is not None:
+            i, speaker, text, task = segment
             full_script.append(f"{speaker}: {text}")
-
-            # Generate speech for this line
-            response = await openai.audio.speech.create(
-                model="tts-1", voice=voices[speaker], input=text
-            )
-
-            # Save the audio file
+            audio = await task
             file_path = os.path.join(output_dir, f"{podcast_id}_{i:03d}_{speaker}.mp3")
-            response.write_to_file(file_path)
-
-            audio_files.append({"file": file_path, "speaker": speaker, "text": text})
+            await asyncio.to_thread(_write_file, file_path, audio)
+            if stitched_path is not None:
+                # MP3 frames are self-contained, so segments can simply be appended
+                await asyncio.to_thread(_write_file, stitched_path, audio, "ab")
+
+            entry = {"file": file_path, "speaker": speaker, "text": text}
+            audio_files.append(entry)
+            if on_segment is not None:
+                await on_segment(entry, audio)
+        # Raise any error reading the script
+        await reader
 
         # Also save the full text script
         script_path = os.path.join(output_dir, f"{podcast_id}_script.txt")
-        with open(script_path, "w") as f:
-            f.write("\n".join(full_script))
+        await asyncio.to_thread(_write_file, script_path, "\n".join(full_script), "w")
 
-        return {
+        result = {
             "status": "success",
             "podcast_id": podcast_id,
             "audio_files": audio_files,
             "script_file": script_path,
         }
+        if stitched_path is not None:
+            result["audio_file"] = stitched_path
+        return result
 
     except Exception as e:
         return {
@@ -598,6 +1643,28 @@ async def generate_podcast_audio(podcast_data):
             "message": f"Error generating audio: {str(e)}",
             "traceback": traceback.format_exc(),
         }
+    finally:
+        pending = list(tasks.values())
+        if reader is not None:
+            pending.append(reader)
+        for task in pending:
+            task.cancel()
+        if client is not None:
+            # Let cancelled requests unwind before their connections close
+            await asyncio.gather(*pending, return_exceptions=True)
+            await client.close()
+
+
+async def script_lines(lines):
+    """
+    Iterate over podcast lines given as a list or as an async iterable.
+    """
+    if hasattr(lines, "__aiter__"):
+        async for line in lines:
+            yield line
+    else:
+        for line in lines:
+            yield line
 
 
 # Test the function
@@ -608,5 +1675,5 @@ if __name__ == "__main__":
         "question": "What are the latest advancements in uncertainty estimation in neural networks?",
     }
     result = asyncio.run(investigate(data))
-    print(json.dumps(result, indent=2))
+    print(json.dumps(result, indent=2, default=dict))
 # Output:
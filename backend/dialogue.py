@@ -0,0 +1,138 @@
+import json
+
+SPEAKERS = ("Jane", "Alex")
+
+
+class DialogueParser:
+    """
+    Incremental parser for generated podcast scripts.
+
+    feed() takes the text as it streams in and returns the dialogue turns it
+    completed, so speech synthesis can start on the first lines while the
+    rest is still being generated. Scripts are expected as a JSON array of
+    {"speaker", "text"} objects; each object is decoded as soon as its
+    closing brace arrives, and anything around the objects (prose, code
+    fences, a missing closing bracket) is ignored. Only a brace opening a
+    line or following "[", "," or another object starts an object, so
+    braces inside a spoken line are text. Output without any dialogue
+    object is read line by line as "Jane: ..." / "Alex: ...", with other
+    non-empty lines continuing the current speaker; braced text that does
+    not decode into a turn is read as lines too.
+
+    Every character is looked at once, tracking string and brace state, so
+    parsing stays linear however long or malformed the output is.
+    """
+
+    def __init__(self, speakers=SPEAKERS):
+        self.speakers = speakers
+        self.turns = []
+        self._buffer = ""
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._seen_json = False
+        self._speaker = None
+        # Last non-blank character outside objects, "\n" at a line start,
+        # and where in the buffer the object being read starts
+        self._last = "\n"
+        self._start = 0
+
+    def feed(self, text):
+        """
+        Add the next piece of generated text and return the turns it completed.
+        """
+        completed = []
+        buffer = self._buffer + text
+        # Start of the line, or the rest of a line after an object, still unread
+        begin = 0
+        for position in range(len(self._buffer), len(buffer)):
+            char = buffer[position]
+            if self._depth:
+                if self._in_string:
+                    if self._escaped:
+                        self._escaped = False
+                    elif char == "\\":
+                        self._escaped = True
+                    elif char == '"':
+                        self._in_string = False
+                elif char == '"':
+                    self._in_string = True
+                elif char == "{":
+                    self._depth += 1
+                elif char == "}":
+                    self._depth -= 1
+                    if not self._depth:
+                        self._last = char
+                        text = buffer[self._start : position + 1]
+                        if self._object(text, completed) or self._seen_json:
+                            begin = position + 1
+                        else:
+                            # Not a dialogue object, so read it as lines after
+                            # all; its last line goes on past the brace
+                            *lines, _ = buffer[begin : position + 1].split("\n")
+                            for line in lines:
+                                self._line(line, completed)
+                                begin += len(line) + 1
+            elif char == "{" and self._last in "\n[,}":
+                self._depth = 1
+                self._start = position
+            elif char == "\n":
+                if not self._seen_json:
+                    self._line(buffer[begin:position], completed)
+                begin = position + 1
+                self._last = char
+            elif not char.isspace():
+                self._last = char
+        self._start -= begin
+        self._buffer = buffer[begin:]
+        self.turns.extend(completed)
+        return completed
+
+    def finish(self):
+        """
+        Flush the end of the output and return the turns it completed.
+        """
+        completed = []
+        if not self._seen_json:
+            for line in self._buffer.split("\n"):
+                self._line(line, completed)
+        self._buffer = ""
+        self.turns.extend(completed)
+        return completed
+
+    def _object(self, text, completed):
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError:
+            return False
+        if (
+            isinstance(item, dict)
+            and item.get("speaker") in self.speakers
+            and isinstance(item.get("text"), str)
+        ):
+            self._seen_json = True
+            completed.append({"speaker": item["speaker"], "text": item["text"]})
+            return True
+        return False
+
+    def _line(self, line, completed):
+        line = line.strip()
+        for speaker in self.speakers:
+            if line.startswith(f"{speaker}:"):
+                self._speaker = speaker
+                text = line[len(speaker) + 1 :].strip()
+                completed.append({"speaker": speaker, "text": text})
+                return
+        if self._speaker and line:
+            # Continue previous speaker's line
+            completed.append({"speaker": self._speaker, "text": line})
+
+
+def parse_dialogue(text, speakers=SPEAKERS):
+    """
+    The dialogue turns of a complete generated script.
+    """
+    parser = DialogueParser(speakers)
+    parser.feed(text)
+    parser.finish()
+    return parser.turns
@@ -0,0 +1,163 @@
+import asyncio
+import os
+import time
+
+from investigation_cache import investigation_key
+from llm_scheduler import get_openai_scheduler
+
+# How often the most popular digests are recomputed; 0 disables warm-up
+DIGEST_WARMUP_INTERVAL = float(os.environ.get("DIGEST_WARMUP_INTERVAL", 300))
+# How many of the most requested digests are kept warm, and how long a
+# warmed result is served; it is replaced well before then while popular
+DIGEST_WARMUP_TOP = int(os.environ.get("DIGEST_WARMUP_TOP", 10))
+DIGEST_MAX_AGE = float(os.environ.get("DIGEST_MAX_AGE", 900))
+# Request count a digest needs before it is worth warming, and the half-life
+# in seconds of each request's weight: three requests an hour ago count 1.5
+DIGEST_MIN_REQUESTS = float(os.environ.get("DIGEST_MIN_REQUESTS", 2))
+DIGEST_HALF_LIFE = float(os.environ.get("DIGEST_HALF_LIFE", 3600))
+DIGEST_TRACKED = 1000
+# Refreshes wait while more live investigations than this are running, or
+# while less than this share of the OpenAI request rate is left
+DIGEST_MAX_LIVE = int(os.environ.get("DIGEST_MAX_LIVE", 2))
+DIGEST_MIN_HEADROOM = float(os.environ.get("DIGEST_MIN_HEADROOM", 0.5))
+# Comparison calls one refresh may spend
+DIGEST_BUDGET_CALLS = int(os.environ.get("DIGEST_BUDGET_CALLS", 200))
+
+
+class DigestWarmer:
+    """
+    Keeps the results of the most requested investigations ready.
+
+    record() counts every live request by its normalized (topic, time_frame,
+    question, podcast), with counts halving every half_life seconds. Every interval
+    the top digests are recomputed through the InvestigationCoalescer, one at
+    a time, and cached there for max_age seconds, so hot requests are
+    answered at once. A refresh runs under its capped request's own key, so
+    a live request arriving mid-refresh does not join it: it is served the
+    previous result while that is cached, and computed on its own otherwise.
+
+    Refreshes only run while live traffic leaves room: no more than max_live
+    investigations in flight and at least min_headroom of the request rate
+    left. Each one is capped at budget_calls comparison requests; earlier
+    rankings, judgments and summaries make most of them far cheaper than
+    that. A refresh that hits the cap is not served in place of the full
+    digest, and requests bringing their own budget are not counted.
+
+    compute(data, publish) is the coroutine function running an
+    investigation. Tasks belong to one event loop, so use one warmer per loop.
+    """
+
+    def __init__(
+        self,
+        compute,
+        coalescer,
+        interval=DIGEST_WARMUP_INTERVAL,
+        top=DIGEST_WARMUP_TOP,
+        max_age=DIGEST_MAX_AGE,
+        min_requests=DIGEST_MIN_REQUESTS,
+        half_life=DIGEST_HALF_LIFE,
+        max_live=DIGEST_MAX_LIVE,
+        min_headroom=DIGEST_MIN_HEADROOM,
+        budget_calls=DIGEST_BUDGET_CALLS,
+    ):
+        self.compute = compute
+        self.coalescer = coalescer
+        self.interval = interval
+        self.top = top
+        self.max_age = max_age
+        self.min_requests = min_requests
+        self.half_life = half_life
+        self.max_live = max_live
+        self.min_headroom = min_headroom
+        self.budget_calls = budget_calls
+        self.requests = {}
+        self.stats = {"refreshed": 0, "capped": 0, "failed": 0}
+
+    def _decayed(self, entry, now):
+        return entry["count"] * 0.5 ** ((now - entry["at"]) / self.half_life)
+
+    def record(self, data):
+        """
+        Count a live request for the digest data asks for.
+        """
+        if data.get("budget"):
+            return
+        key = investigation_key(data)
+        now = time.time()
+        entry = self.requests.get(key)
+        count = self._decayed(entry, now) if entry is not None else 0.0
+        self.requests[key] = {
+            "count": count + 1,
+            "at": now,
+            "data": {
+                name: data[name]
+                for name in ("topic", "time_frame", "question", "podcast")
+                if name in data
+            },
+        }
+        if len(self.requests) > DIGEST_TRACKED:
+            # Forget the least requested tenth rather than one at a time
+            ranked = sorted(
+                self.requests, key=lambda key: self._decayed(self.requests[key], now)
+            )
+            for key in ranked[: DIGEST_TRACKED // 10]:
+                del self.requests[key]
+
+    def popular(self):
+        """
+        Request data of the most requested digests, most popular first.
+        """
+        now = time.time()
+        counts = {
+            key: self._decayed(entry, now) for key, entry in self.requests.items()
+        }
+        ranked = sorted(
+            (key for key in counts if counts[key] >= self.min_requests),
+            key=lambda key: -counts[key],
+        )
+        return [self.requests[key]["data"] for key in ranked[: self.top]]
+
+    def busy(self):
+        """
+        True while live traffic needs the capacity a refresh would take.
+        """
+        return (
+            len(self.coalescer.in_flight) > self.max_live
+            or get_openai_scheduler().requests.available() < self.min_headroom
+        )
+
+    async def refresh(self, data):
+        """
+        Recompute one digest once live traffic leaves room for it.
+        """
+        while self.busy():
+            await asyncio.sleep(1)
+        # Run under the capped request's own key, so live requests never
+        # join a refresh that may be cut short, then serve it if it was not
+        capped = dict(data, budget={"calls": self.budget_calls})
+        try:
+            result = await self.coalescer.run(
+                capped,
+                lambda publish: self.compute(capped, publish),
+                refresh=True,
+                ttl=self.max_age,
+            )
+            self.coalescer.store(data, result, ttl=self.max_age)
+        except Exception as e:
+            result = {"status": "error", "message": str(e)}
+        status = "refreshed" if result.get("status") == "success" else "failed"
+        if status == "refreshed" and result.get("budget_exhausted"):
+            status = "capped"
+        self.stats[status] += 1
+        if status == "failed":
+            print(f"Error warming digest {investigation_key(data)}: {result}")
+
+    async def run_forever(self):
+        """
+        Refresh the popular digests every interval seconds until cancelled.
+        """
+        while True:
+            started = time.monotonic()
+            for data in self.popular():
+                await self.refresh(data)
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
@@ -0,0 +1,171 @@
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict
+
+from judgment_cache import normalize_question
+
+# Identical investigations within this many seconds share one result; 0 disables
+INVESTIGATION_CACHE_TTL = float(os.environ.get("INVESTIGATION_CACHE_TTL", 120))
+INVESTIGATION_CACHE_MAX_ENTRIES = int(
+    os.environ.get("INVESTIGATION_CACHE_MAX_ENTRIES", 256)
+)
+TIME_FRAMES = ("week", "month", "year")
+BUDGET_LIMITS = ("calls", "tokens", "seconds")
+
+
+def investigation_key(data):
+    """
+    Normalized (topic, time_frame, question, podcast, budget) of an
+    investigate request, with the same defaults investigate applies.
+    """
+    topic = re.sub(r"\s+", " ", (data.get("topic") or "").strip().lower())
+    time_frame = data.get("time_frame", "week")
+    if time_frame not in TIME_FRAMES:
+        time_frame = "week"
+    question = data.get("question", f"Recent developments in {data.get('topic', '')}")
+    podcast = data.get("podcast") or None
+    if podcast is not None and podcast != "audio":
+        podcast = "script"
+    limits = data.get("budget")
+    budget = ()
+    if isinstance(limits, dict):
+        budget = tuple(
+            (name, str(limits[name]))
+            for name in BUDGET_LIMITS
+            if limits.get(name) not in (None, "")
+        )
+    return topic, time_frame, normalize_question(question), podcast, budget
+
+
+class _Flight:
+    """
+    One in-flight investigation and the requests waiting on it.
+    """
+
+    def __init__(self):
+        self.task = None
+        self.ttl = None
+        self.events = []
+        self.listeners = []
+        self.waiters = 0
+
+    async def publish(self, event):
+        self.events.append(event)
+        for listener in list(self.listeners):
+            try:
+                await listener(event)
+            except Exception as e:
+                print(f"Error delivering progress event: {e}")
+
+
+class InvestigationCoalescer:
+    """
+    Single-flight deduplication plus a short-lived result cache for investigate.
+
+    Concurrent requests with the same normalized key share one computation:
+    later arrivals replay the progress events published so far and then
+    receive the rest live. The computation is cancelled only once every
+    request waiting on it has gone away. Successful results are kept for ttl
+    seconds, least recently used first out beyond max_entries; results cut
+    short by their ranking budget are not kept. Tasks belong to one event
+    loop, so use one coalescer per loop.
+
+    Background refreshes (see digests.py) pass refresh=True to recompute a
+    result even if one is cached, and their own ttl to keep it longer.
+    """
+
+    def __init__(
+        self, ttl=INVESTIGATION_CACHE_TTL, max_entries=INVESTIGATION_CACHE_MAX_ENTRIES
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.results = OrderedDict()
+        self.in_flight = {}
+        self.stats = {"hits": 0, "coalesced": 0, "misses": 0}
+
+    def _cached(self, key):
+        entry = self.results.get(key)
+        if entry is None:
+            return None
+        expires, result = entry
+        if time.time() > expires:
+            del self.results[key]
+            return None
+        self.results.move_to_end(key)
+        return result
+
+    def _store(self, key, result, ttl):
+        if (
+            ttl <= 0
+            or not isinstance(result, dict)
+            or result.get("status") != "success"
+            or result.get("budget_exhausted")
+        ):
+            return
+        self.results[key] = (time.time() + ttl, result)
+        self.results.move_to_end(key)
+        while len(self.results) > self.max_entries:
+            self.results.popitem(last=False)
+
+    def _finish(self, key, flight, task):
+        if self.in_flight.get(key) is flight:
+            del self.in_flight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        self._store(key, task.result(), self.ttl if flight.ttl is None else flight.ttl)
+
+    def store(self, data, result, ttl=None):
+        """
+        Cache a result computed elsewhere as the answer for data, unless it
+        was cut short by its budget.
+        """
+        self._store(investigation_key(data), result, self.ttl if ttl is None else ttl)
+
+    async def run(self, data, compute, progress=None, refresh=False, ttl=None):
+        """
+        Result of compute(publish) for data, shared with identical requests.
+        compute is a coroutine function taking the progress callback to pass
+        on to investigate; progress, if given, receives every event.
+        refresh skips the cached result, and ttl, if given, replaces the
+        cache's own for the new one.
+        """
+        key = investigation_key(data)
+        result = None if refresh else self._cached(key)
+        if result is not None:
+            self.stats["hits"] += 1
+            return result
+
+        flight = self.in_flight.get(key)
+        if flight is None:
+            self.stats["misses"] += 1
+            flight = _Flight()
+            flight.task = asyncio.create_task(compute(flight.publish))
+            flight.task.add_done_callback(lambda task: self._finish(key, flight, task))
+            self.in_flight[key] = flight
+        else:
+            self.stats["coalesced"] += 1
+        if ttl is not None:
+            flight.ttl = max(ttl, flight.ttl or 0)
+
+        flight.waiters += 1
+        try:
+            if progress is not None:
+                # Catch up on earlier events; nothing can be published between
+                # the last replayed event and subscribing
+                replayed = 0
+                while replayed < len(flight.events):
+                    await progress(flight.events[replayed])
+                    replayed += 1
+                flight.listeners.append(progress)
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if progress in flight.listeners:
+                flight.listeners.remove(progress)
+            if flight.waiters == 0 and not flight.task.done():
+                # Nobody wants the result any more; later requests start afresh
+                if self.in_flight.get(key) is flight:
+                    del self.in_flight[key]
+                flight.task.cancel()
@@ -0,0 +1,402 @@
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+JOB_STORE_PATH = os.environ.get("JOB_STORE_PATH", "jobs.sqlite3")
+# Investigations run at the same time per server process
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 4))
+# Queued jobs per server process before new submissions are refused
+JOB_QUEUE_LIMIT = int(os.environ.get("JOB_QUEUE_LIMIT", 1000))
+# Finished jobs and their results are kept this many seconds
+JOB_RESULT_TTL = float(os.environ.get("JOB_RESULT_TTL", 24 * 3600))
+MAX_PRIORITY = 9
+
+FINISHED = ("succeeded", "failed", "cancelled")
+
+
+class QueueFull(Exception):
+    """
+    Raised when a job is submitted to a full queue.
+    """
+
+
+class JobStore:
+    """
+    SQLite record of every job: its request, status and result.
+
+    The record is what clients poll, so any process sharing the file can
+    answer for jobs running in another one. A cancellation requested from a
+    process that is not running the job is left as status "cancelling" for
+    the owner to act on. Safe to share between threads.
+    """
+
+    def __init__(self, path=JOB_STORE_PATH, ttl=JOB_RESULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                client TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                request TEXT NOT NULL,
+                result TEXT,
+                pid INTEGER NOT NULL,
+                created REAL NOT NULL,
+                started REAL,
+                finished REAL
+            )
+            """)
+        self._conn.commit()
+
+    def create(self, job_id, client, priority, data):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, client, priority, status, request, pid, created)"
+                " VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, client, priority, json.dumps(data), os.getpid(), time.time()),
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._conn.execute(
+                    "DELETE FROM jobs WHERE finished < ?", (time.time() - self.ttl,)
+                )
+            self._conn.commit()
+
+    def update(self, job_id, **fields):
+        if "result" in fields:
+            # default=dict encodes Paper records
+            fields["result"] = json.dumps(fields["result"], default=dict)
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id)
+            )
+            self._conn.commit()
+
+    def start(self, job_id):
+        """
+        Mark a queued job running. Returns False if it is no longer queued,
+        e.g. because another process asked for it to be cancelled.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'running', started = ?"
+                " WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def get(self, job_id):
+        """
+        The job's record as a dict, or None if there is no such job.
+        """
+        with self._lock:
+            cursor = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+            row = cursor.fetchone()
+            names = [column[0] for column in cursor.description]
+        if row is None:
+            return None
+        record = dict(zip(names, row))
+        record["request"] = json.loads(record["request"])
+        record["result"] = json.loads(record["result"]) if record["result"] else None
+        return record
+
+    def request_cancel(self, job_id):
+        """
+        Mark an unfinished job for cancellation by the process running it.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'cancelling' WHERE id = ?"
+                " AND status IN ('queued', 'running')",
+                (job_id,),
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def cancelling(self, pid):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE pid = ? AND status = 'cancelling'", (pid,)
+            ).fetchall()
+        return [job_id for (job_id,) in rows]
+
+    def recover(self):
+        """
+        Fail unfinished jobs whose process is gone, e.g. after a restart.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT pid FROM jobs"
+                " WHERE status IN ('queued', 'running', 'cancelling')"
+            ).fetchall()
+            for (pid,) in rows:
+                if pid == os.getpid() or _alive(pid):
+                    continue
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', finished = ?, result = ?"
+                    " WHERE pid = ? AND status IN ('queued', 'running', 'cancelling')",
+                    (
+                        time.time(),
+                        json.dumps(
+                            {"status": "error", "message": "The server restarted"}
+                        ),
+                        pid,
+                    ),
+                )
+            self._conn.commit()
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Job:
+    """
+    A submitted investigation and the clients following its progress.
+    """
+
+    def __init__(self, job_id, client, priority, data):
+        self.id = job_id
+        self.client = client
+        self.priority = priority
+        self.data = data
+        self.status = "queued"
+        self.cancelled = False
+        self.task = None
+        self.events = []
+        self.listeners = []
+        self.done = asyncio.Event()
+
+    async def publish(self, event):
+        self.events.append(event)
+        for listener in list(self.listeners):
+            try:
+                await listener(event)
+            except Exception as e:
+                print(f"Error delivering job event: {e}")
+
+
+class JobQueue:
+    """
+    Bounded pool running investigations submitted as jobs.
+
+    Up to workers jobs run at once. Waiting jobs are taken by priority (higher
+    first) and then round-robin across clients, so one client submitting many
+    jobs cannot starve the others. Cancelling a running job cancels its task,
+    which cancels every outstanding comparison request. Status and results go
+    to a JobStore so they outlive the connection that submitted them.
+
+    run(data, progress) is the coroutine function doing the work. Tasks belong
+    to one event loop, so use one queue per loop.
+    """
+
+    def __init__(self, run, store, workers=JOB_WORKERS, limit=JOB_QUEUE_LIMIT):
+        self.run = run
+        self.store = store
+        self.workers = workers
+        self.limit = limit
+        self.jobs = {}
+        self.stats = {"submitted": 0, "succeeded": 0, "failed": 0, "cancelled": 0}
+        self._heap = []
+        self._queued_by_client = {}
+        self._sequence = itertools.count()
+        self._ready = asyncio.Condition()
+        self._tasks = []
+
+    @property
+    def queued(self):
+        return sum(self._queued_by_client.values())
+
+    @property
+    def running(self):
+        return sum(1 for job in self.jobs.values() if job.status == "running")
+
+    def start(self):
+        self.store.recover()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._watch_cancellations()))
+
+    async def stop(self):
+        """
+        Cancel the workers and their jobs, and fail every job left unfinished,
+        so nobody polls a job this process will never finish.
+        """
+        for task in self._tasks:
+            task.cancel()
+        for job in list(self.jobs.values()):
+            if job.task is not None:
+                job.task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for job in list(self.jobs.values()):
+            if job.status == "queued":
+                self._dequeued(job)
+            self._finish(
+                job, "failed", {"status": "error", "message": "The server stopped"}
+            )
+        self._heap.clear()
+
+    async def submit(self, data, client, priority=0):
+        """
+        Queue an investigation and return its Job. Raises QueueFull.
+        """
+        if self.queued >= self.limit:
+            raise QueueFull(f"{self.queued} jobs are already waiting")
+        priority = max(0, min(MAX_PRIORITY, int(priority)))
+        job = Job(uuid.uuid4().hex, client, priority, data)
+        self.store.create(job.id, client, priority, data)
+        self.jobs[job.id] = job
+        self.stats["submitted"] += 1
+
+        # A client's nth waiting job goes behind every other client's first
+        turn = self._queued_by_client.get(client, 0)
+        self._queued_by_client[client] = turn + 1
+        async with self._ready:
+            heapq.heappush(self._heap, (-priority, turn, next(self._sequence), job.id))
+            self._ready.notify()
+        return job
+
+    def _dequeued(self, job):
+        self._queued_by_client[job.client] -= 1
+        if not self._queued_by_client[job.client]:
+            del self._queued_by_client[job.client]
+
+    def cancel(self, job_id):
+        """
+        Cancel a job. Returns False if it is unknown or already finished.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            # Another process may be running it
+            return self.store.request_cancel(job_id)
+        if job.status in FINISHED:
+            return False
+        if job.status == "queued":
+            self._dequeued(job)
+            self._finish(job, "cancelled", None)
+            return True
+        # A job whose task is not created yet is cancelled by its worker
+        job.cancelled = True
+        if job.task is not None:
+            job.task.cancel()
+        return True
+
+    def record(self, job_id):
+        """
+        The stored record of a job, without its request, or None.
+        """
+        record = self.store.get(job_id)
+        if record is None:
+            return None
+        job = self.jobs.get(job_id)
+        if job is not None and job.status == "queued":
+            record["position"] = sum(
+                1 for entry in self._heap if entry < self._entry(job)
+            )
+        del record["request"], record["pid"]
+        return record
+
+    def _entry(self, job):
+        for entry in self._heap:
+            if entry[3] == job.id:
+                return entry
+        return None
+
+    async def follow(self, job_id, progress, poll_interval=1.0):
+        """
+        Await progress with the job's events so far and as they come, and
+        return its final record. Jobs run by another process are followed by
+        polling the store, with a "status" event on every change.
+        """
+        job = self.jobs.get(job_id)
+        if job is not None:
+            replayed = 0
+            while replayed < len(job.events):
+                await progress(job.events[replayed])
+                replayed += 1
+            job.listeners.append(progress)
+            try:
+                await job.done.wait()
+            finally:
+                job.listeners.remove(progress)
+            return self.record(job_id)
+
+        status = None
+        while True:
+            record = self.record(job_id)
+            if record is None or record["status"] in FINISHED:
+                return record
+            if record["status"] != status:
+                status = record["status"]
+                await progress({"event": "status", "job_id": job_id, "status": status})
+            await asyncio.sleep(poll_interval)
+
+    def _finish(self, job, status, result):
+        job.status = status
+        self.stats[status] += 1
+        self.store.update(job.id, status=status, result=result, finished=time.time())
+        job.done.set()
+        # The store has the result from now on
+        self.jobs.pop(job.id, None)
+
+    async def _work(self):
+        while True:
+            async with self._ready:
+                await self._ready.wait_for(lambda: self._heap)
+                *_, job_id = heapq.heappop(self._heap)
+            job = self.jobs.get(job_id)
+            if job is None or job.status != "queued":
+                continue
+            self._dequeued(job)
+            # A cancellation requested through another process leaves the
+            # job "cancelling" in the store, where it must not be overwritten
+            if job.cancelled or not self.store.start(job.id):
+                self._finish(job, "cancelled", None)
+                continue
+            job.status = "running"
+            await job.publish(
+                {"event": "status", "job_id": job.id, "status": "running"}
+            )
+            if job.cancelled:
+                self._finish(job, "cancelled", None)
+                continue
+            job.task = asyncio.create_task(self.run(job.data, job.publish))
+            try:
+                result = await job.task
+            except asyncio.CancelledError:
+                if not job.cancelled:
+                    # The worker itself is being stopped
+                    raise
+                self._finish(job, "cancelled", None)
+            except Exception as e:
+                self._finish(job, "failed", {"status": "error", "message": str(e)})
+            else:
+                status = "succeeded" if result.get("status") == "success" else "failed"
+                self._finish(job, status, result)
+
+    async def _watch_cancellations(self, interval=1.0):
+        # Act on cancellations requested through another process
+        while True:
+            await asyncio.sleep(interval)
+            for job_id in self.store.cancelling(os.getpid()):
+                job = self.jobs.get(job_id)
+                if job is None or not self.cancel(job_id):
+                    self.store.update(job_id, status="cancelled", finished=time.time())
@@ -0,0 +1,87 @@
+import os
+import re
+import threading
+
+from sqlite_cache import SQLiteCache
+
+JUDGMENT_CACHE_PATH = os.environ.get("JUDGMENT_CACHE_PATH", "judgment_cache.sqlite3")
+JUDGMENT_CACHE_TTL = float(os.environ.get("JUDGMENT_CACHE_TTL", 30 * 24 * 3600))
+JUDGMENT_CACHE_MAX_ENTRIES = int(os.environ.get("JUDGMENT_CACHE_MAX_ENTRIES", 200000))
+
+
+def normalize_question(question):
+    """
+    Normalize a question so trivially different phrasings share cache entries:
+    case, surrounding whitespace, repeated spaces and trailing punctuation.
+    """
+    question = re.sub(r"\s+", " ", (question or "").strip().lower())
+    return question.rstrip("?!. ")
+
+
+class JudgmentCache(SQLiteCache):
+    """
+    On-disk cache of pairwise relevance judgments.
+
+    Keys are (normalized question, ordered entry_id pair, model), so a pair
+    judged as (A, B) is also served when asked as (B, A). Expiry, eviction
+    and hit counting are those of SQLiteCache.
+    """
+
+    table = "judgments"
+    key_columns = (
+        ("question", "TEXT"),
+        ("first_id", "TEXT"),
+        ("second_id", "TEXT"),
+        ("model", "TEXT"),
+    )
+    value_columns = (("first_won", "INTEGER"),)
+
+    def __init__(
+        self,
+        path=JUDGMENT_CACHE_PATH,
+        ttl=JUDGMENT_CACHE_TTL,
+        max_entries=JUDGMENT_CACHE_MAX_ENTRIES,
+    ):
+        super().__init__(path, ttl, max_entries)
+
+    @staticmethod
+    def _key(question, id1, id2, model):
+        first_id, second_id = sorted((id1, id2))
+        return normalize_question(question), first_id, second_id, model
+
+    def get(self, question, id1, id2, model):
+        """
+        Return 1 if id1 was judged more relevant, 2 if id2 was, or None on a miss.
+        """
+        key = self._key(question, id1, id2, model)
+        row = self._lookup(key)
+        if row is None:
+            return None
+        first_won = bool(row[0])
+        # Map the stored ordered pair back onto the caller's order
+        return 1 if first_won == (id1 == key[1]) else 2
+
+    def put(self, question, id1, id2, model, winner):
+        """
+        Store a judgment; winner is 1 if id1 was more relevant, otherwise 2.
+        """
+        key = self._key(question, id1, id2, model)
+        first_won = (winner == 1) == (id1 == key[1])
+        self._store(key, (int(first_won),))
+
+
+_judgment_cache = None
+_judgment_cache_lock = threading.Lock()
+
+
+def get_judgment_cache():
+    """
+    The process-wide judgment cache, or None when JUDGMENT_CACHE_PATH is empty.
+    """
+    global _judgment_cache
+    if not JUDGMENT_CACHE_PATH:
+        return None
+    with _judgment_cache_lock:
+        if _judgment_cache is None:
+            _judgment_cache = JudgmentCache()
+        return _judgment_cache
@@ -0,0 +1,198 @@
+import asyncio
+import email.utils
+import os
+import random
+import threading
+import time
+import weakref
+import aiohttp
+
+OPENAI_MAX_CONCURRENCY = int(os.environ.get("OPENAI_MAX_CONCURRENCY", 16))
+OPENAI_REQUESTS_PER_MINUTE = int(os.environ.get("OPENAI_REQUESTS_PER_MINUTE", 500))
+OPENAI_TOKENS_PER_MINUTE = int(os.environ.get("OPENAI_TOKENS_PER_MINUTE", 200000))
+
+# Statuses worth retrying: rate limiting, timeouts and transient server errors
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMRequestError(Exception):
+    """
+    Raised when a request still fails after all retries.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(f"LLM request failed ({status}): {message}")
+        self.status = status
+
+
+def estimate_tokens(text):
+    """
+    Rough token count for rate limiting (about 4 characters per token).
+    """
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at rate_per_minute.
+
+    acquire() reserves its amount immediately, letting the level go negative,
+    and sleeps until the refill covers the debt, so waiters are served in
+    arrival order. adjust() corrects a reservation once the real cost is known.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60
+        self.capacity = capacity or rate_per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        with self._lock:
+            self._refill()
+            self.level -= min(amount, self.capacity)
+            wait = -self.level / self.rate if self.level < 0 else 0
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def available(self):
+        """
+        The share of the bucket's capacity currently available.
+        """
+        with self._lock:
+            self._refill()
+            return self.level / self.capacity
+
+    def adjust(self, amount):
+        with self._lock:
+            self._refill()
+            self.level -= amount
+
+
+class LLMScheduler:
+    """
+    Shared gate for chat-completion requests.
+
+    Bounds the number of requests in flight, keeps request and token rates
+    under the account limits with token buckets, and retries rate-limited or
+    transient failures with exponential backoff and full jitter, honouring
+    Retry-After. A 429 pauses every caller until the server's retry time.
+    """
+
+    def __init__(
+        self,
+        max_concurrency=OPENAI_MAX_CONCURRENCY,
+        requests_per_minute=OPENAI_REQUESTS_PER_MINUTE,
+        tokens_per_minute=OPENAI_TOKENS_PER_MINUTE,
+        max_retries=5,
+        base_delay=0.5,
+        max_delay=30.0,
+        timeout=60.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.paused_until = 0.0
+        self.stats = {
+            "requests": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "failures": 0,
+            "tokens": 0,
+        }
+        # asyncio semaphores belong to one event loop, so keep one per loop
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphores[loop]
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    @staticmethod
+    def _retry_after(headers):
+        value = headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            parsed = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            # Neither seconds nor an HTTP date, so fall back to backoff
+            return None
+        return max(0.0, parsed.timestamp() - time.time())
+
+    async def post_json(self, session, url, headers, payload, tokens):
+        """
+        POST payload and return the decoded JSON body of a 200 response.
+        tokens is the estimated prompt plus completion size, reconciled with
+        the reported usage afterwards. Raises LLMRequestError on failure.
+        """
+        for attempt in range(self.max_retries + 1):
+            pause = self.paused_until - time.time()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            await self.requests.acquire(1)
+            await self.tokens.acquire(tokens)
+
+            async with self._semaphore():
+                self.stats["requests"] += 1
+                try:
+                    async with session.post(
+                        url, headers=headers, json=payload, timeout=self.timeout
+                    ) as response:
+                        if response.status == 200:
+                            result = await response.json()
+                            used = result.get("usage", {}).get("total_tokens")
+                            if used:
+                                self.tokens.adjust(used - tokens)
+                            self.stats["tokens"] += used or tokens
+                            return result
+                        body = await response.text()
+                        status = response.status
+                        retry_after = self._retry_after(response.headers)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    body, status, retry_after = str(e) or type(e).__name__, None, None
+
+            retryable = status is None or status in RETRY_STATUSES
+            if not retryable or attempt == self.max_retries:
+                self.stats["failures"] += 1
+                raise LLMRequestError(status, body)
+
+            delay = retry_after if retry_after is not None else self._backoff(attempt)
+            if status == 429:
+                self.stats["rate_limited"] += 1
+                self.paused_until = max(self.paused_until, time.time() + delay)
+            self.stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+
+_openai_scheduler = None
+_openai_scheduler_lock = threading.Lock()
+
+
+def get_openai_scheduler():
+    """
+    The process-wide scheduler for OpenAI chat-completion requests.
+    """
+    global _openai_scheduler
+    with _openai_scheduler_lock:
+        if _openai_scheduler is None:
+            _openai_scheduler = LLMScheduler()
+        return _openai_scheduler
@@ -0,0 +1,210 @@
+import contextlib
+import math
+import threading
+import time
+
+METRICS_PREFIX = "arxiv_assistant"
+# Upper bounds, in seconds, of the stage latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+    return f"{{{pairs}}}"
+
+
+class Metrics:
+    """
+    Minimal thread-safe registry of counters and latency histograms,
+    rendered in the Prometheus text exposition format.
+
+    Collectors are functions called at render time that return
+    (name, type, labels, value) samples for state kept elsewhere, such as the
+    LLM scheduler and cache statistics.
+
+    Every process has its own registry. Pre-fork workers share theirs as
+    snapshot() data, which render_workers combines into one exposition.
+    """
+
+    def __init__(self, prefix=METRICS_PREFIX, buckets=LATENCY_BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}
+        self.collectors = []
+        self._lock = threading.Lock()
+
+    def count(self, name, amount=1, **labels):
+        """
+        Add amount to the counter name with the given labels.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        """
+        Record one observation in the histogram name with the given labels.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {
+                    "buckets": [0] * len(self.buckets),
+                    "count": 0,
+                    "sum": 0.0,
+                }
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram["buckets"][position] += 1
+            histogram["count"] += 1
+            histogram["sum"] += value
+
+    @contextlib.contextmanager
+    def stage(self, name, timings=None):
+        """
+        Time the enclosed block as pipeline stage name. The duration goes to
+        the stage_seconds histogram and, if a timings dict is given, is added
+        to timings[name].
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe("stage_seconds", elapsed, stage=name)
+            if timings is not None:
+                timings[name] = round(timings.get(name, 0.0) + elapsed, 6)
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def _samples(self):
+        """
+        Current counter and collector samples by (name, type), and a copy of
+        every histogram by (name, labels).
+        """
+        samples = {}
+        with self._lock:
+            for (name, labels), value in self.counters.items():
+                samples.setdefault((f"{name}_total", "counter"), []).append(
+                    (labels, value)
+                )
+            histograms = {
+                key: dict(value, buckets=list(value["buckets"]))
+                for key, value in self.histograms.items()
+            }
+        for collector in list(self.collectors):
+            try:
+                for name, kind, labels, value in collector():
+                    samples.setdefault((name, kind), []).append(
+                        (tuple(sorted(labels.items())), value)
+                    )
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+        return samples, histograms
+
+    def render(self):
+        """
+        All metrics in the Prometheus text format.
+        """
+        return self._format(*self._samples())
+
+    def snapshot(self):
+        """
+        All current samples as plain JSON data, for render_workers in
+        another process.
+        """
+        samples, histograms = self._samples()
+        return {
+            "samples": [
+                [name, kind, [list(pair) for pair in labels], value]
+                for (name, kind), values in samples.items()
+                for labels, value in values
+            ],
+            "histograms": [
+                [name, [list(pair) for pair in labels], histogram]
+                for (name, labels), histogram in histograms.items()
+            ],
+        }
+
+    def render_workers(self, snapshots):
+        """
+        The metrics of several worker processes in the Prometheus text
+        format, from their snapshot() keyed by worker. Counters and
+        histograms are summed over the workers; gauges describe one
+        worker's state and keep a worker label.
+        """
+        samples = {}
+        totals = {}
+        histograms = {}
+        for worker, snapshot in sorted(snapshots.items()):
+            for name, kind, labels, value in snapshot["samples"]:
+                labels = tuple(tuple(pair) for pair in labels)
+                if kind == "counter":
+                    key = (name, kind, labels)
+                    totals[key] = totals.get(key, 0) + value
+                    continue
+                if "worker" not in dict(labels):
+                    labels = tuple(sorted(labels + (("worker", str(worker)),)))
+                samples.setdefault((name, kind), []).append((labels, value))
+            for name, labels, histogram in snapshot["histograms"]:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                total = histograms.setdefault(
+                    key, {"buckets": [0] * len(self.buckets), "count": 0, "sum": 0.0}
+                )
+                total["buckets"] = [
+                    a + b for a, b in zip(total["buckets"], histogram["buckets"])
+                ]
+                total["count"] += histogram["count"]
+                total["sum"] += histogram["sum"]
+        for (name, kind, labels), value in totals.items():
+            samples.setdefault((name, kind), []).append((labels, value))
+        return self._format(samples, histograms)
+
+    def _format(self, samples, histograms):
+        lines = []
+        for (name, kind), values in sorted(samples.items()):
+            lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+            for labels, value in sorted(values):
+                lines.append(f"{self.prefix}_{name}{_label_text(labels)} {value}")
+
+        by_name = {}
+        for (name, labels), histogram in histograms.items():
+            by_name.setdefault(name, []).append((labels, histogram))
+        for name, entries in sorted(by_name.items()):
+            lines.append(f"# TYPE {self.prefix}_{name} histogram")
+            for labels, histogram in sorted(entries, key=lambda entry: entry[0]):
+                for bound, count in zip(
+                    self.buckets + (math.inf,),
+                    histogram["buckets"] + [histogram["count"]],
+                ):
+                    le = "+Inf" if bound == math.inf else repr(float(bound))
+                    lines.append(
+                        f"{self.prefix}_{name}_bucket"
+                        f"{_label_text(labels + (('le', le),))} {count}"
+                    )
+                lines.append(
+                    f"{self.prefix}_{name}_sum{_label_text(labels)} {histogram['sum']}"
+                )
+                lines.append(
+                    f"{self.prefix}_{name}_count{_label_text(labels)} {histogram['count']}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    """
+    The process-wide metrics registry.
+    """
+    return _metrics
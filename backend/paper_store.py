@@ -0,0 +1,350 @@
+import asyncio
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+
+from arxiv_fetch import fetch_window
+from papers import paper_record
+
+PAPER_STORE_PATH = os.environ.get("PAPER_STORE_PATH", "paper_store.json")
+# How often the harvester refreshes tracked topics; 0 disables it
+PAPER_HARVEST_INTERVAL = float(os.environ.get("PAPER_HARVEST_INTERVAL", 900))
+# How far back a newly tracked topic is harvested, and how many papers at most
+PAPER_HARVEST_DAYS = int(os.environ.get("PAPER_HARVEST_DAYS", 365))
+PAPER_HARVEST_MAX_RESULTS = int(os.environ.get("PAPER_HARVEST_MAX_RESULTS", 1000))
+# A topic is answered locally only if it was harvested this recently
+PAPER_STORE_MAX_AGE = float(os.environ.get("PAPER_STORE_MAX_AGE", 3600))
+# How often processes that do not harvest reload the store file
+PAPER_STORE_REFRESH_INTERVAL = float(os.environ.get("PAPER_STORE_REFRESH_INTERVAL", 30))
+
+COLUMNS = (
+    "title",
+    "authors",
+    "summary",
+    "published",
+    "pdf_url",
+    "entry_id",
+    "comment",
+    "doi",
+)
+
+
+def _day(value):
+    """
+    Day number of a date, datetime or "%Y-%m-%d" string.
+    """
+    if isinstance(value, str):
+        value = datetime.date.fromisoformat(value[:10])
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    return value.toordinal()
+
+
+class PaperStore:
+    """
+    Local store of arXiv papers for answering topic/time-window queries.
+
+    Papers are kept as their shared Paper records, one row each, next to an
+    array of their publication days.
+
+    The store also remembers which topics were harvested, back to which day
+    and when, and the entry_ids arXiv returned for each, so callers know
+    whether a query can be answered locally. A harvested topic is answered
+    with exactly the papers arXiv matched for it (field queries like
+    "cat:cs.LG" and stemmed matches included), filtered by day.
+
+    Several processes can share one store file: one of them harvests and
+    saves, the others refresh() from disk and pass the topics they want
+    harvested through a "<path>.requests" file.
+    """
+
+    def __init__(self, path=PAPER_STORE_PATH):
+        self.path = path
+        # The Paper record of each row, returned by queries as is
+        self.records = []
+        self.days = np.zeros(0, dtype=np.int64)
+        self.rows = {}
+        self.topics = {}
+        self.pending = set()
+        self._dirty = False
+        self._mtime = 0.0
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, papers):
+        """
+        Add paper dicts, skipping entry_ids already in the store.
+        Records are made before taking the lock, so run this off the event
+        loop without holding up queries for long.
+        """
+        prepared = [
+            (paper_record(paper), _day(paper["published"]))
+            for paper in papers
+            if paper["entry_id"] not in self.rows
+        ]
+        with self._lock:
+            new_days = []
+            for record, day in prepared:
+                if record.entry_id in self.rows:
+                    continue
+                self.rows[record.entry_id] = len(self.records)
+                self.records.append(record)
+                new_days.append(day)
+            if new_days:
+                self.days = np.concatenate(
+                    [self.days, np.array(new_days, dtype=np.int64)]
+                )
+                self._dirty = True
+            return len(new_days)
+
+    def track(self, topic, since, harvested_at=None, entry_ids=()):
+        """
+        Record that topic has been harvested back to the date since, and
+        that arXiv returned the papers with entry_ids for it.
+        """
+        key = topic.strip().lower()
+        with self._lock:
+            coverage = self.topics.get(key, {})
+            self.topics[key] = {
+                "since": min(_day(since), coverage.get("since", _day(since))),
+                "harvested_at": harvested_at or time.time(),
+                "entry_ids": sorted(
+                    set(coverage.get("entry_ids", ())) | set(entry_ids)
+                ),
+            }
+            self.pending.discard(key)
+            self._dirty = True
+
+    def request(self, topic):
+        """
+        Ask the harvester to start tracking topic on its next run.
+        """
+        key = topic.strip().lower()
+        if key and key not in self.topics and key not in self.pending:
+            self.pending.add(key)
+            if self.path:
+                # Appends this small are atomic, so processes can share the file
+                with open(f"{self.path}.requests", "a") as f:
+                    f.write(f"{key}\n")
+
+    def collect_requests(self):
+        """
+        Move topics requested by any process sharing the store into pending.
+        """
+        if not self.path:
+            return
+        requests = f"{self.path}.requests"
+        taken = f"{requests}.{os.getpid()}"
+        try:
+            os.replace(requests, taken)
+        except FileNotFoundError:
+            return
+        with open(taken) as f:
+            keys = {line.strip() for line in f if line.strip()}
+        os.remove(taken)
+        with self._lock:
+            self.pending.update(key for key in keys if key not in self.topics)
+
+    def covers(self, topic, cutoff_date, max_age=PAPER_STORE_MAX_AGE):
+        """
+        True if topic was harvested back to cutoff_date within max_age seconds.
+        """
+        coverage = self.topics.get(topic.strip().lower())
+        return (
+            coverage is not None
+            and "entry_ids" in coverage
+            and coverage["since"] <= _day(cutoff_date)
+            and time.time() - coverage["harvested_at"] <= max_age
+        )
+
+    def query(self, topic, cutoff_date, limit=None):
+        """
+        Papers harvested for topic and published on or after cutoff_date,
+        newest first; none if topic is not tracked (see covers).
+        """
+        cutoff = _day(cutoff_date)
+        with self._lock:
+            coverage = self.topics.get(topic.strip().lower())
+            if coverage is None or "entry_ids" not in coverage:
+                return []
+            rows = np.fromiter(
+                (
+                    self.rows[entry_id]
+                    for entry_id in coverage["entry_ids"]
+                    if entry_id in self.rows
+                ),
+                dtype=np.int64,
+            )
+            rows = rows[self.days[rows] >= cutoff]
+            # Newest first; rows break ties so the order is stable
+            rows = rows[np.lexsort((rows, -self.days[rows]))]
+            if limit is not None:
+                rows = rows[:limit]
+            return [self.records[row] for row in rows]
+
+    def save(self):
+        """
+        Write the papers, column by column, and the topic coverage to disk if
+        anything changed.
+        """
+        if not self.path:
+            return
+        # One save at a time, so an older snapshot never replaces a newer one
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                # Records are immutable and topic entries are replaced, not
+                # changed, so shallow copies are enough to encode outside the lock
+                records = self.records[:]
+                topics = dict(self.topics)
+                self._dirty = False
+            columns = {
+                name: [getattr(record, name) for record in records] for name in COLUMNS
+            }
+            snapshot = json.dumps({"columns": columns, "topics": topics})
+            # A name of its own, as other processes may save at once
+            handle, temporary = tempfile.mkstemp(
+                prefix=f"{os.path.basename(self.path)}.",
+                suffix=".tmp",
+                dir=os.path.dirname(os.path.abspath(self.path)),
+            )
+            try:
+                with os.fdopen(handle, "w") as f:
+                    f.write(snapshot)
+                os.replace(temporary, self.path)
+            except BaseException:
+                os.remove(temporary)
+                raise
+            self._mtime = os.path.getmtime(self.path)
+
+    def refresh(self):
+        """
+        Load what another process saved since this one last loaded or saved.
+        Returns True if the file had changed.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return False
+        if os.path.getmtime(self.path) <= self._mtime:
+            return False
+        self.load()
+        return True
+
+    def load(self):
+        mtime = os.path.getmtime(self.path)
+        with open(self.path) as f:
+            data = json.load(f)
+        columns = data.get("columns", {})
+        count = len(columns.get("entry_id", []))
+        papers = [
+            {name: columns[name][row] for name in COLUMNS} for row in range(count)
+        ]
+        with self._lock:
+            self.add(papers)
+            self.topics = data.get("topics", {})
+            self.pending.difference_update(self.topics)
+            self._dirty = False
+            self._mtime = mtime
+
+
+async def harvest(store, topics=None):
+    """
+    Fetch papers newer than the last harvest for every tracked or requested
+    topic (or the given ones) and add them to the store. New topics are
+    harvested back PAPER_HARVEST_DAYS, which can go well past the 50-result
+    live search cap, and so are topics tracked before the store recorded
+    their entry_ids. Adding and saving run off the event loop.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    store.collect_requests()
+    for topic in topics or list(store.topics) + list(store.pending):
+        coverage = store.topics.get(topic.strip().lower())
+        if coverage is not None and "entry_ids" not in coverage:
+            coverage = None
+        if coverage is None:
+            start = now - datetime.timedelta(days=PAPER_HARVEST_DAYS)
+        else:
+            start = datetime.datetime.fromtimestamp(
+                coverage["harvested_at"], datetime.timezone.utc
+            ) - datetime.timedelta(days=1)
+        try:
+            papers = await fetch_window(topic, start, now, PAPER_HARVEST_MAX_RESULTS)
+        except Exception as e:
+            print(f"Error harvesting {topic!r}: {e}")
+            continue
+        await asyncio.to_thread(store.add, papers)
+        entry_ids = [paper["entry_id"] for paper in papers]
+        if coverage is None:
+            # A truncated harvest only covers back to its oldest paper
+            oldest = min((paper["published"] for paper in papers), default=None)
+            full = len(papers) >= PAPER_HARVEST_MAX_RESULTS
+            store.track(
+                topic, oldest if full and oldest else start, entry_ids=entry_ids
+            )
+        else:
+            since = datetime.date.fromordinal(coverage["since"])
+            store.track(topic, since, entry_ids=entry_ids)
+    await asyncio.to_thread(store.save)
+
+
+async def harvest_forever(store, interval=PAPER_HARVEST_INTERVAL):
+    """
+    Refresh tracked topics every interval seconds until cancelled.
+    """
+    while True:
+        try:
+            await harvest(store)
+        except Exception as e:
+            print(f"Error in paper harvester: {e}")
+        await asyncio.sleep(interval)
+
+
+async def follow_store(store, interval=PAPER_STORE_REFRESH_INTERVAL):
+    """
+    Pick up what the harvesting process saves, every interval seconds, until
+    cancelled. For processes sharing a store file without harvesting.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(store.refresh)
+        except Exception as e:
+            print(f"Error refreshing paper store: {e}")
+
+
+def start_harvester(store, interval=PAPER_HARVEST_INTERVAL):
+    """
+    Run harvest_forever on a daemon thread, for callers without an event loop.
+    """
+    thread = threading.Thread(
+        target=asyncio.run,
+        args=(harvest_forever(store, interval),),
+        name="paper-harvester",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+_paper_store = None
+_paper_store_lock = threading.Lock()
+
+
+def get_paper_store():
+    """
+    The process-wide paper store, loaded from PAPER_STORE_PATH on first use.
+    """
+    global _paper_store
+    with _paper_store_lock:
+        if _paper_store is None:
+            _paper_store = PaperStore()
+        return _paper_store
@@ -0,0 +1,133 @@
+import json
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+FIELDS = (
+    "title",
+    "authors",
+    "summary",
+    "published",
+    "pdf_url",
+    "entry_id",
+    "comment",
+    "doi",
+)
+# Paper records kept for reuse by entry_id, with their encoded JSON
+PAPER_RECORDS_SIZE = 20000
+
+_records = OrderedDict()
+_records_lock = threading.Lock()
+
+
+class Paper(Mapping):
+    """
+    Immutable, slotted record of one arXiv paper.
+
+    Reads like the paper dicts used throughout the pipeline (paper["title"],
+    paper.get("doi"), dict(paper)) at a fraction of their memory. Its JSON
+    encoding is made once, on first use, and spliced into every response that
+    includes the paper (see dumps). Ranked papers are copies made with
+    scored(), which also carry a relevance_score.
+    """
+
+    __slots__ = FIELDS + ("relevance_score", "_json")
+
+    def __init__(
+        self,
+        title,
+        authors,
+        summary,
+        published,
+        pdf_url,
+        entry_id,
+        comment=None,
+        doi=None,
+        relevance_score=None,
+    ):
+        values = (title, tuple(authors or ()), summary, published, pdf_url, entry_id)
+        for name, value in zip(FIELDS, values + (comment, doi)):
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, "relevance_score", relevance_score)
+        object.__setattr__(self, "_json", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Paper records are immutable")
+
+    def _fields(self):
+        if self.relevance_score is None:
+            return FIELDS
+        return FIELDS + ("relevance_score",)
+
+    def __getitem__(self, name):
+        if name in FIELDS or (
+            name == "relevance_score" and self.relevance_score is not None
+        ):
+            return getattr(self, name)
+        raise KeyError(name)
+
+    def __iter__(self):
+        return iter(self._fields())
+
+    def __len__(self):
+        return len(self._fields())
+
+    def __repr__(self):
+        return f"Paper({self.entry_id!r}, {self.title!r})"
+
+    def json(self):
+        """
+        The paper encoded as a JSON object.
+        """
+        if self._json is None:
+            object.__setattr__(self, "_json", json.dumps(dict(self)))
+        return self._json
+
+    def scored(self, score):
+        """
+        A copy of the paper with relevance_score set, reusing its encoding.
+        """
+        paper = Paper(*(getattr(self, name) for name in FIELDS), relevance_score=score)
+        encoded = f'{self.json()[:-1]}, "relevance_score": {json.dumps(score)}}}'
+        object.__setattr__(paper, "_json", encoded)
+        return paper
+
+
+def paper_record(paper):
+    """
+    The shared Paper record for a paper dict, made once per entry_id so its
+    JSON is only encoded once however many requests return it.
+    """
+    if isinstance(paper, Paper):
+        return paper
+    entry_id = paper["entry_id"]
+    with _records_lock:
+        record = _records.get(entry_id)
+        if record is not None and record.title == paper["title"]:
+            _records.move_to_end(entry_id)
+            return record
+    record = Paper(*(paper.get(name) for name in FIELDS))
+    with _records_lock:
+        _records[entry_id] = record
+        _records.move_to_end(entry_id)
+        if len(_records) > PAPER_RECORDS_SIZE:
+            _records.popitem(last=False)
+    return record
+
+
+def dumps(value):
+    """
+    json.dumps that splices in the cached encoding of every Paper in value
+    instead of encoding its fields again.
+    """
+    if isinstance(value, Paper):
+        return value.json()
+    if isinstance(value, dict):
+        items = (
+            f"{json.dumps(key if isinstance(key, str) else str(key))}: {dumps(item)}"
+            for key, item in value.items()
+        )
+        return "{" + ", ".join(items) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(dumps(item) for item in value) + "]"
+    return json.dumps(value)
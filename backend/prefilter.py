@@ -0,0 +1,99 @@
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+import numpy as np
+
+PREFILTER_TOP_M = int(os.environ.get("PREFILTER_TOP_M", 30))
+# Hashed feature space; collisions only blur the scores slightly at this size
+FEATURE_DIM = 2**14
+TERMS_CACHE_SIZE = 20000
+
+STOPWORDS = set("""
+    a an and are as at be by can for from has have in is it its of on or our
+    that the their these this to was we were what which with within how do
+    does new recent latest using based paper papers show shows propose study
+    """.split())
+
+_terms_cache = OrderedDict()
+_terms_cache_lock = threading.Lock()
+
+
+def tokenize(text):
+    """
+    Lowercase word tokens without stopwords or single characters.
+    """
+    return [
+        token
+        for token in re.findall(r"[a-z0-9]+", (text or "").lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def term_counts(text):
+    """
+    Sparse hashed term counts of the text as (feature indices, counts).
+    """
+    hashes = [zlib.crc32(token.encode()) % FEATURE_DIM for token in tokenize(text)]
+    indices, counts = np.unique(np.array(hashes, dtype=np.int64), return_counts=True)
+    return indices, counts.astype(np.float32)
+
+
+def paper_terms(paper):
+    """
+    Term counts for a paper (title counted twice), cached by entry_id so a
+    paper seen in earlier requests is not tokenized again.
+    """
+    key = paper.get("entry_id")
+    with _terms_cache_lock:
+        if key is not None and key in _terms_cache:
+            _terms_cache.move_to_end(key)
+            return _terms_cache[key]
+    terms = term_counts(f"{paper['title']} {paper['title']} {paper['summary']}")
+    if key is not None:
+        with _terms_cache_lock:
+            _terms_cache[key] = terms
+            if len(_terms_cache) > TERMS_CACHE_SIZE:
+                _terms_cache.popitem(last=False)
+    return terms
+
+
+def relevance_scores(papers, question):
+    """
+    TF-IDF cosine similarity between the question and every paper.
+
+    The cached term counts are concatenated into one sparse (row, feature,
+    count) matrix, weighted with sublinear term frequency and an IDF computed
+    over the candidate pool, and scored against the question with vectorized
+    gathers and bincounts, so the cost is linear in the number of terms.
+    """
+    n = len(papers)
+    terms = [paper_terms(paper) for paper in papers]
+    rows = np.repeat(np.arange(n), [len(indices) for indices, _ in terms])
+    features = np.concatenate([indices for indices, _ in terms])
+    counts = np.concatenate([counts for _, counts in terms])
+
+    document_frequency = np.bincount(features, minlength=FEATURE_DIM)
+    idf = np.log((1 + n) / (1 + document_frequency)) + 1
+    weights = np.log1p(counts) * idf[features]
+    norms = np.sqrt(np.bincount(rows, weights**2, n)).clip(min=1e-12)
+
+    query = np.zeros(FEATURE_DIM)
+    query_features, query_counts = term_counts(question)
+    query[query_features] = np.log1p(query_counts) * idf[query_features]
+    query /= max(np.linalg.norm(query), 1e-12)
+    return np.bincount(rows, weights * query[features], n) / norms
+
+
+def prefilter_papers(papers, question, top_m=PREFILTER_TOP_M):
+    """
+    Keep the top_m papers most similar to the question, in their original order.
+    Cheap first stage before the pairwise LLM ranking in summary_filter; pools
+    of top_m papers or fewer, and top_m <= 0, are returned unchanged.
+    """
+    if top_m <= 0 or len(papers) <= top_m:
+        return papers
+    scores = relevance_scores(papers, question)
+    keep = np.sort(np.argsort(-scores, kind="stable")[:top_m])
+    return [papers[i] for i in keep]
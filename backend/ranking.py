@@ -0,0 +1,817 @@
+import asyncio
+import math
+import time
+import numpy as np
+
+from metrics import get_metrics
+
+# Bootstrap samples behind the top-k posterior, and the share of them that
+# must agree with the current top k before a ranking stops early
+TOP_K_SAMPLES = 64
+TOP_K_CONFIDENCE = 0.9
+# Share of n judgments the anytime strategy records between two refreshes of
+# the top-k posterior, which takes milliseconds and runs off the event loop
+TOP_K_REFRESH = 0.1
+# Active strategies only start pairs worth at least this share of the best one
+MIN_PAIR_VALUE = 0.3
+
+
+def _comparison_edges(win_matrix):
+    """
+    Flatten the comparison results into (winners, losers, counts, n).
+
+    Accepts a dense n x n win matrix where win_matrix[i, j] counts wins of i
+    over j, a scipy.sparse matrix with the same layout, or a
+    (winners, losers, counts, n) tuple for incomplete comparison graphs.
+    """
+    if isinstance(win_matrix, tuple):
+        winners, losers, counts, n = win_matrix
+        return (
+            np.asarray(winners, dtype=np.intp),
+            np.asarray(losers, dtype=np.intp),
+            np.asarray(counts, dtype=float),
+            int(n),
+        )
+    if hasattr(win_matrix, "tocoo"):
+        coo = win_matrix.tocoo()
+        keep = coo.row != coo.col
+        return (
+            coo.row[keep].astype(np.intp),
+            coo.col[keep].astype(np.intp),
+            coo.data[keep].astype(float),
+            coo.shape[0],
+        )
+    win_matrix = np.asarray(win_matrix, dtype=float)
+    winners, losers = np.nonzero(win_matrix)
+    keep = winners != losers
+    winners, losers = winners[keep], losers[keep]
+    return winners, losers, win_matrix[winners, losers], len(win_matrix)
+
+
+def _sum_by(index, weights, n):
+    return np.bincount(index, weights, n).astype(float, copy=False)
+
+
+def _information(winners, losers, counts, scores, prior):
+    """
+    Fisher information of each log score given the comparisons played.
+    """
+    n = len(scores)
+    p = scores[winners] / (scores[winners] + scores[losers])
+    per_edge = counts * p * (1 - p)
+    information = _sum_by(winners, per_edge, n) + _sum_by(losers, per_edge, n)
+    if prior:
+        # Pseudo-games against a virtual opponent of score 1
+        ghost = scores / (scores + 1)
+        information += 2 * prior * ghost * (1 - ghost)
+    return information
+
+
+def bradley_terry_fit(
+    win_matrix, initial=None, prior=0.0, tol=1e-8, max_iter=1000, z=1.96
+):
+    """
+    Fit a Bradley-Terry model with the vectorized MM algorithm (Hunter, 2004).
+
+    win_matrix can be dense, scipy.sparse or a (winners, losers, counts, n)
+    tuple; only the comparisons that were actually played are touched, so the
+    cost per iteration is O(n + comparisons). initial warm-starts from the
+    "strengths" of an earlier fit (or any scores, when prior is 0). prior adds
+    that many pseudo-wins and pseudo-losses against a virtual opponent of
+    score 1, which keeps papers that never won (or were never compared)
+    finite in incomplete graphs. Iterates until the largest change in the
+    normalized scores drops below tol.
+
+    Returns a dict with the normalized "scores", their z-standard-error
+    "lower" and "upper" bounds, the unnormalized "strengths" (for warm
+    starts), "iterations" and "converged".
+    """
+    winners, losers, counts, n = _comparison_edges(win_matrix)
+    if n == 0:
+        empty = np.zeros(0)
+        return {
+            "scores": empty,
+            "lower": empty,
+            "upper": empty,
+            "strengths": empty,
+            "iterations": 0,
+            "converged": True,
+        }
+
+    wins = _sum_by(winners, counts, n) + prior
+    if initial is None:
+        # Start on a mean-1 scale, which is also where the virtual opponent sits
+        scores = np.ones(n)
+    else:
+        scores = np.where(np.asarray(initial) > 0, initial, 1e-12).astype(float)
+        if not prior:
+            scores = scores / np.mean(scores)
+
+    def mm_step(current):
+        per_edge = counts / (current[winners] + current[losers])
+        denom = _sum_by(winners, per_edge, n) + _sum_by(losers, per_edge, n)
+        if prior:
+            denom += 2 * prior / (current + 1)
+        updated = np.where(denom > 0, wins / np.where(denom > 0, denom, 1), current)
+        if not prior:
+            # Without the virtual opponent the likelihood is scale free
+            updated = updated / np.mean(updated)
+        return updated
+
+    # SQUAREM extrapolation (Varadhan & Roland, 2008) on the log scores cuts
+    # the iteration count of plain MM by an order of magnitude. It needs every
+    # score to stay positive, so graphs with winless papers and no prior fall
+    # back to plain MM steps.
+    accelerate = bool(np.all(wins > 0))
+    converged = False
+    iterations = 0
+    while iterations < max_iter:
+        first = mm_step(scores)
+        iterations += 1
+        if accelerate:
+            second = mm_step(first)
+            iterations += 1
+            r = np.log(first) - np.log(scores)
+            v = np.log(second) - np.log(first) - r
+            v_norm = np.linalg.norm(v)
+            if v_norm > 0:
+                alpha = min(-1.0, -np.linalg.norm(r) / v_norm)
+                jumped = np.exp(np.log(scores) - 2 * alpha * r + alpha**2 * v)
+                if not prior:
+                    jumped = jumped / np.mean(jumped)
+                if np.all(np.isfinite(jumped)):
+                    first = mm_step(jumped)
+                    iterations += 1
+                else:
+                    first = second
+            else:
+                first = second
+        change = np.max(np.abs(first - scores)) / np.max(first)
+        scores = first
+        if change < tol:
+            converged = True
+            break
+
+    strengths = scores
+    information = _information(winners, losers, counts, strengths, prior)
+    scores = strengths / np.sum(strengths)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        spread = np.exp(z / np.sqrt(information))
+        lower = scores / spread
+        # Items with no information are unbounded above, even at score 0
+        upper = np.where(np.isfinite(spread), scores * spread, np.inf)
+    return {
+        "scores": scores,
+        "lower": lower,
+        "upper": upper,
+        "strengths": strengths,
+        "iterations": iterations,
+        "converged": converged,
+    }
+
+
+def bradley_terry_scores(win_matrix, initial=None, prior=0.0, tol=1e-8):
+    """
+    Compute the Bradley-Terry model scores from a win matrix.
+    Scores are normalized to sum to 1; see bradley_terry_fit for the options.
+    """
+    return bradley_terry_fit(win_matrix, initial=initial, prior=prior, tol=tol)[
+        "scores"
+    ]
+
+
+def fit_scores(win_matrix, previous=None, z=1.0, prior=0.5):
+    """
+    Bradley-Terry fit used while a ranking is in progress.
+    The prior keeps papers which were never compared, or never won, at a
+    finite score below the winners; previous warm-starts from the last fit.
+    """
+    initial = None if previous is None else previous["strengths"]
+    return bradley_terry_fit(win_matrix, initial=initial, prior=prior, tol=1e-6, z=z)
+
+
+def _sum_rows(index, weights, n):
+    """
+    _sum_by for every row of a (samples, edges) weights array at once.
+    """
+    rows = len(weights)
+    flat = (np.arange(rows)[:, None] * n + index).ravel()
+    return np.bincount(flat, weights.ravel(), rows * n).reshape(rows, n)
+
+
+def top_k_posterior(
+    win_matrix, fit, k, samples=TOP_K_SAMPLES, prior=0.5, iterations=30
+):
+    """
+    Bayesian bootstrap of the top k.
+
+    Refits the Bradley-Terry model samples times, warm-started from fit,
+    with every comparison and every prior pseudo-game reweighted by an
+    Exp(1) draw. Resampling the prior as well keeps a paper with one or two
+    games uncertain, instead of writing it off after an early loss.
+    Returns a (samples, n) boolean array marking the top k of each sample.
+    """
+    winners, losers, counts, n = _comparison_edges(win_matrix)
+    if n <= k:
+        return np.ones((samples, n), dtype=bool)
+    weights = counts * np.random.exponential(size=(samples, len(counts)))
+    pseudo_wins = prior * np.random.exponential(size=(samples, n))
+    pseudo_games = pseudo_wins + prior * np.random.exponential(size=(samples, n))
+    wins = _sum_rows(winners, weights, n) + pseudo_wins
+    strengths = np.tile(fit["strengths"], (samples, 1))
+    for _ in range(iterations):
+        per_edge = weights / (strengths[:, winners] + strengths[:, losers])
+        denom = _sum_rows(winners, per_edge, n) + _sum_rows(losers, per_edge, n)
+        strengths = wins / (denom + pseudo_games / (strengths + 1))
+    members = np.zeros((samples, n), dtype=bool)
+    top = np.argpartition(-strengths, k - 1, axis=1)[:, :k]
+    np.put_along_axis(members, top, True, axis=1)
+    return members
+
+
+def top_k_settled(fit, k, members, confidence=TOP_K_CONFIDENCE):
+    """
+    True when at least confidence of the top_k_posterior samples in members
+    have exactly the current top k.
+    """
+    scores = fit["scores"]
+    if len(scores) <= k:
+        return True
+    top = np.zeros(len(scores), dtype=bool)
+    top[np.argsort(-scores)[:k]] = True
+    return np.mean(np.all(members == top, axis=1)) >= confidence
+
+
+async def _gather_within(awaitables, budget=None):
+    """
+    asyncio.gather(..., return_exceptions=True), except that whatever is
+    still running when the wall time of budget runs out is cancelled and
+    comes back as None.
+    """
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    timeout = budget.time_left() if budget is not None else None
+    try:
+        if tasks and timeout is not None:
+            await asyncio.wait(tasks, timeout=max(timeout, 0))
+            for task in tasks:
+                task.cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        raise
+    return [
+        None if isinstance(result, asyncio.CancelledError) else result
+        for result in results
+    ]
+
+
+async def play_round(pairs, judge, win_matrix, budget=None):
+    """
+    Run one batch of comparisons concurrently and record the winners.
+    judge(i, j) must return 1 if item i wins and 2 if item j wins, or None when
+    no real judgment could be made. Failed comparisons are left out of the win
+    matrix rather than filled with a random winner, and so are the ones still
+    running when the wall time of budget runs out, which are cancelled.
+    Returns the number of comparisons that produced a judgment.
+    """
+    results = await _gather_within((judge(i, j) for i, j in pairs), budget)
+    judged = 0
+    for (i, j), winner in zip(pairs, results):
+        if isinstance(winner, Exception):
+            print(f"Error in comparison task: {winner}")
+            continue
+        if winner == 1:
+            win_matrix[i, j] += 1
+        elif winner == 2:
+            win_matrix[j, i] += 1
+        else:
+            continue
+        judged += 1
+    return judged
+
+
+def _pair_by_score(candidates, scores, played):
+    """
+    Swiss pairing: walk the candidates from best to worst score and pair each
+    with the next closest-scored candidate it has not met yet.
+    """
+    order = sorted(candidates, key=lambda i: -scores[i])
+    pairs = []
+    unpaired = list(order)
+    while len(unpaired) > 1:
+        i = unpaired.pop(0)
+        for pos, j in enumerate(unpaired):
+            if (min(i, j), max(i, j)) not in played:
+                pairs.append((i, j))
+                unpaired.pop(pos)
+                break
+    return pairs
+
+
+async def exhaustive_rank(n, judge, k=3, win_matrix=None, budget=None, on_round=None):
+    """
+    Compare every pair once, all at the same time. This is the original
+    summary_filter behaviour and uses n * (n - 1) / 2 comparisons.
+    """
+    if win_matrix is None:
+        win_matrix = np.zeros((n, n))
+    pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+    await play_round(pairs, judge, win_matrix, budget)
+    if on_round is not None:
+        await on_round(win_matrix)
+    return win_matrix
+
+
+async def swiss_rank(
+    n,
+    judge,
+    k=3,
+    win_matrix=None,
+    max_rounds=None,
+    open_rounds=2,
+    keep=0.7,
+    z=1.0,
+    budget=None,
+    on_round=None,
+):
+    """
+    Swiss-system tournament with top-k elimination.
+
+    Each round pairs the remaining contenders by their current Bradley-Terry
+    score, so close papers meet each other. After the first open_rounds,
+    only the best keep fraction of contenders (never fewer than 2k) go on
+    to the next round, until every remaining pair has met. Papers dropped
+    on a few games stay uncertain, so unlike the active strategies this
+    plays its whole schedule. Uses O(n log n) comparisons.
+    """
+    if win_matrix is None:
+        win_matrix = np.zeros((n, n))
+    if max_rounds is None:
+        max_rounds = 3 * math.ceil(math.log2(max(n, 2)))
+
+    played = set()
+    contenders = list(np.random.permutation(n))
+    fit = fit_scores(win_matrix, z=z)
+    for round_number in range(1, max_rounds + 1):
+        pairs = _pair_by_score(contenders, fit["scores"], played)
+        if not pairs or _exhausted(budget):
+            break
+        await play_round(pairs, judge, win_matrix, budget)
+        played.update((min(i, j), max(i, j)) for i, j in pairs)
+        if on_round is not None:
+            await on_round(win_matrix)
+
+        fit = fit_scores(win_matrix, previous=fit, z=z)
+        if round_number >= open_rounds:
+            scores = fit["scores"]
+            survivors = max(2 * k, math.ceil(len(contenders) * keep))
+            contenders = sorted(contenders, key=lambda i: -scores[i])[:survivors]
+    return win_matrix
+
+
+def pair_values(fit, win_matrix, k, members):
+    """
+    Upper-triangular matrix of how informative comparing each pair would be:
+    highest for pairs whose outcome is closest to a coin flip, weighted
+    towards papers whose place in the top k is uncertain in the
+    top_k_posterior samples in members and against pairs that already met.
+    """
+    scores = fit["scores"]
+    # How uncertain each paper's membership of the top k is
+    share = members.mean(axis=0)
+    boundary = share * (1 - share) + 0.01
+
+    p = scores[:, None] / (scores[:, None] + scores[None, :])
+    games = win_matrix + win_matrix.T
+    value = p * (1 - p) * np.outer(boundary, boundary) / (1 + games)
+    np.fill_diagonal(value, 0)
+    return np.triu(value)
+
+
+async def active_rank(
+    n,
+    judge,
+    k=3,
+    win_matrix=None,
+    max_comparisons=None,
+    budget=None,
+    z=1.0,
+    confidence=TOP_K_CONFIDENCE,
+    on_round=None,
+):
+    """
+    Active pairing by Bradley-Terry uncertainty.
+
+    After one random seeding round, each batch picks the most informative
+    disjoint pairs (see pair_values), leaving out pairs worth less than
+    MIN_PAIR_VALUE of the best one. Stops as soon as the top k are settled
+    at confidence, once max_comparisons (default n log2 n) have been
+    started, or once budget is exhausted.
+    """
+    if win_matrix is None:
+        win_matrix = np.zeros((n, n))
+    if max_comparisons is None:
+        max_comparisons = math.ceil(n * math.log2(max(n, 2)))
+
+    seed = list(np.random.permutation(n))
+    pairs = list(zip(seed[::2], seed[1::2]))
+    await play_round(pairs, judge, win_matrix, budget)
+    # Attempts are counted, so failing judgments cannot loop forever
+    started = len(pairs)
+    batch_size = max(1, n // 2)
+
+    fit = None
+    while started < max_comparisons and not _exhausted(budget):
+        fit = fit_scores(win_matrix, previous=fit, z=z)
+        members = await asyncio.to_thread(top_k_posterior, win_matrix, fit, k)
+        if top_k_settled(fit, k, members, confidence):
+            break
+        value = pair_values(fit, win_matrix, k, members)
+
+        pairs = []
+        busy = set()
+        limit = min(batch_size, max_comparisons - started)
+        cutoff = MIN_PAIR_VALUE * value.max()
+        for flat in np.argsort(-value, axis=None):
+            i, j = np.unravel_index(flat, value.shape)
+            if value[i, j] <= cutoff or len(pairs) >= limit:
+                break
+            if i in busy or j in busy:
+                continue
+            pairs.append((int(i), int(j)))
+            busy.update((i, j))
+        if not pairs:
+            break
+        await play_round(pairs, judge, win_matrix, budget)
+        started += len(pairs)
+        if on_round is not None:
+            await on_round(win_matrix)
+    return win_matrix
+
+
+class Budget:
+    """
+    Spending limits for one ranking: comparison calls, tokens and wall time,
+    each None for unlimited. Whoever makes the calls records them with
+    spend(). Every strategy takes a budget: it starts no more comparisons
+    once it is exhausted and cancels the ones in flight when its wall time
+    runs out.
+    """
+
+    def __init__(self, calls=None, tokens=None, seconds=None):
+        self.calls = calls
+        self.tokens = tokens
+        self.seconds = seconds
+        self.calls_used = 0
+        self.tokens_used = 0
+        self.started = time.monotonic()
+
+    def spend(self, calls=1, tokens=0):
+        self.calls_used += calls
+        self.tokens_used += tokens
+
+    def time_left(self):
+        if self.seconds is None:
+            return None
+        return self.seconds - (time.monotonic() - self.started)
+
+    def exhausted(self):
+        time_left = self.time_left()
+        return (
+            (self.calls is not None and self.calls_used >= self.calls)
+            or (self.tokens is not None and self.tokens_used >= self.tokens)
+            or (time_left is not None and time_left <= 0)
+        )
+
+    def used(self):
+        return {
+            "calls": self.calls_used,
+            "tokens": self.tokens_used,
+            "seconds": round(time.monotonic() - self.started, 3),
+        }
+
+
+def _exhausted(budget):
+    return budget is not None and budget.exhausted()
+
+
+def _record(win_matrix, i, j, winner):
+    if winner == 1:
+        win_matrix[i, j] += 1
+    elif winner == 2:
+        win_matrix[j, i] += 1
+
+
+async def anytime_rank(
+    n,
+    judge,
+    k=3,
+    win_matrix=None,
+    budget=None,
+    max_comparisons=None,
+    max_in_flight=16,
+    z=1.0,
+    confidence=TOP_K_CONFIDENCE,
+    on_round=None,
+):
+    """
+    Anytime active ranking that refits as judgments stream in.
+
+    Keeps up to max_in_flight comparisons running. Every finished judgment is
+    recorded and the Bradley-Terry fit is refreshed, warm-started, before the
+    freed slot gets the most informative pair among the papers not already
+    in flight, unless it is worth less than MIN_PAIR_VALUE of the best pair.
+    The top-k posterior behind the pair values is refreshed every
+    TOP_K_REFRESH * n judgments, in a worker thread. As soon as it shows the
+    top k settled at confidence (see top_k_settled), or
+    the budget is exhausted (including its wall time), or max_comparisons
+    (default n log2 n) have been started, the remaining comparisons are
+    cancelled. on_round is awaited every n / 2 judgments.
+    """
+    if win_matrix is None:
+        win_matrix = np.zeros((n, n))
+    if max_comparisons is None:
+        max_comparisons = math.ceil(n * math.log2(max(n, 2)))
+
+    seed = [int(i) for i in np.random.permutation(n)]
+    queue = list(zip(seed[::2], seed[1::2]))
+    in_flight = {}
+    started = 0
+    finished = 0
+    refresh_every = max(1, round(n * TOP_K_REFRESH))
+    unseen = 0
+    fit = fit_scores(win_matrix, z=z)
+    members = await asyncio.to_thread(top_k_posterior, win_matrix, fit, k)
+
+    def out_of_budget():
+        return started >= max_comparisons or (budget is not None and budget.exhausted())
+
+    def next_pair():
+        busy = {item for pair in in_flight.values() for item in pair}
+        while queue:
+            i, j = queue.pop(0)
+            if i not in busy and j not in busy:
+                return i, j
+        value = pair_values(fit, win_matrix, k, members)
+        cutoff = MIN_PAIR_VALUE * value.max()
+        if busy:
+            value[list(busy), :] = 0
+            value[:, list(busy)] = 0
+        flat = int(np.argmax(value))
+        if value.flat[flat] <= cutoff:
+            return None
+        i, j = np.unravel_index(flat, value.shape)
+        return int(i), int(j)
+
+    try:
+        while True:
+            while len(in_flight) < max_in_flight and not out_of_budget():
+                pair = next_pair()
+                if pair is None:
+                    break
+                in_flight[asyncio.ensure_future(judge(*pair))] = pair
+                started += 1
+            if not in_flight:
+                break
+
+            timeout = budget.time_left() if budget is not None else None
+            done, _ = await asyncio.wait(
+                in_flight,
+                timeout=None if timeout is None else max(timeout, 0),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                break
+            for task in done:
+                i, j = in_flight.pop(task)
+                if task.cancelled():
+                    continue
+                if task.exception() is not None:
+                    print(f"Error in comparison task: {task.exception()}")
+                    continue
+                _record(win_matrix, i, j, task.result())
+                finished += 1
+                unseen += 1
+                if on_round is not None and finished % max(1, n // 2) == 0:
+                    await on_round(win_matrix)
+
+            fit = fit_scores(win_matrix, previous=fit, z=z)
+            # Also refresh when nothing is left in flight, as stale pair
+            # values could end the ranking early
+            if unseen >= refresh_every or not in_flight:
+                members = await asyncio.to_thread(top_k_posterior, win_matrix, fit, k)
+                unseen = 0
+                if top_k_settled(fit, k, members, confidence):
+                    break
+    finally:
+        for task in in_flight:
+            task.cancel()
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+    if on_round is not None and finished % max(1, n // 2):
+        await on_round(win_matrix)
+    return win_matrix
+
+
+async def play_groups(groups, group_judge, judge, win_matrix, budget=None):
+    """
+    Rank several groups concurrently with one listwise judgment each.
+
+    group_judge(indices) must return the indices ordered from most to least
+    relevant, or None when the answer could not be parsed. A full ranking of
+    g items carries about g - 1 comparisons' worth of information, so each of
+    the g (g - 1) / 2 implied wins is recorded with weight 2 / g. Groups whose
+    judgment failed fall back to pairwise judgments of neighbouring items,
+    unless budget is exhausted by then; judgments still running when its
+    wall time runs out are cancelled and count as failed.
+    """
+    results = await _gather_within((group_judge(group) for group in groups), budget)
+    fallback_pairs = []
+    for group, order in zip(groups, results):
+        if isinstance(order, Exception) or not order:
+            if isinstance(order, Exception):
+                print(f"Error in listwise judgment: {order}")
+            fallback_pairs.extend(zip(group[:-1], group[1:]))
+            continue
+        weight = 2 / len(order)
+        for position, winner in enumerate(order):
+            for loser in order[position + 1 :]:
+                win_matrix[winner, loser] += weight
+    if fallback_pairs and not _exhausted(budget):
+        await play_round(fallback_pairs, judge, win_matrix, budget)
+    return len(groups) + len(fallback_pairs)
+
+
+def _chunk(items, size, offset=0):
+    """
+    Split items into consecutive groups of size, the first one offset long,
+    folding any single leftover item into its neighbouring group.
+    """
+    bounds = list(range(offset, len(items), size)) + [len(items)]
+    if offset:
+        bounds.insert(0, 0)
+    groups = [items[a:b] for a, b in zip(bounds, bounds[1:])]
+    if len(groups) > 1 and len(groups[-1]) == 1:
+        leftover = groups.pop()
+        groups[-1] = groups[-1] + leftover
+    if len(groups) > 1 and len(groups[0]) == 1:
+        leftover = groups.pop(0)
+        groups[0] = leftover + groups[0]
+    return groups
+
+
+async def listwise_rank(
+    n,
+    judge,
+    k=3,
+    win_matrix=None,
+    group_judge=None,
+    group_size=8,
+    keep=0.6,
+    max_rounds=None,
+    z=1.0,
+    budget=None,
+    on_round=None,
+):
+    """
+    Batched ranking: each request ranks a whole group of papers at once.
+
+    The first two rounds split all papers into groups (randomly, then by
+    score with the group boundaries shifted by half a group) so every paper
+    is seen twice. After that only the best keep fraction of contenders go
+    on, grouped by score, until they fit into one final group. Needs about
+    3n / group_size requests instead of one request per pair.
+    """
+    if group_judge is None:
+        raise ValueError("The listwise strategy needs a group_judge")
+    if win_matrix is None:
+        win_matrix = np.zeros((n, n))
+    if max_rounds is None:
+        max_rounds = 2 + math.ceil(math.log(max(n / group_size, 1), 1 / keep)) + 1
+
+    contenders = [int(i) for i in np.random.permutation(n)]
+    fit = None
+    for round_number in range(1, max_rounds + 1):
+        offset = group_size // 2 if round_number == 2 else 0
+        if _exhausted(budget):
+            break
+        groups = _chunk(contenders, group_size, offset)
+        await play_groups(groups, group_judge, judge, win_matrix, budget)
+        if on_round is not None:
+            await on_round(win_matrix)
+
+        fit = fit_scores(win_matrix, previous=fit, z=z)
+        if len(contenders) <= group_size:
+            break
+        members = await asyncio.to_thread(top_k_posterior, win_matrix, fit, k)
+        if top_k_settled(fit, k, members):
+            break
+        scores = fit["scores"]
+        contenders.sort(key=lambda i: -scores[i])
+        if round_number >= 2:
+            survivors = max(2 * k, math.ceil(len(contenders) * keep))
+            contenders = contenders[:survivors]
+    return win_matrix
+
+
+async def incremental_rank(
+    n,
+    judge,
+    known,
+    k=3,
+    win_matrix=None,
+    initial=None,
+    anchors=3,
+    max_rounds=None,
+    z=1.0,
+    budget=None,
+    on_round=None,
+):
+    """
+    Insert new items into an existing ranking.
+
+    known lists the items ranked before, whose earlier results are already in
+    win_matrix; initial optionally holds warm-start strengths for all n
+    items. Every other item first meets anchors known items spread evenly
+    over the current ranking, then, like a binary insertion, the closest
+    scored item it has not met yet, for up to max_rounds rounds (default
+    log2 n). New items whose interval falls below the top k drop out. Uses
+    O(new * log n) comparisons.
+    """
+    if win_matrix is None:
+        win_matrix = np.zeros((n, n))
+    if max_rounds is None:
+        max_rounds = math.ceil(math.log2(max(n, 2)))
+
+    known_set = {int(i) for i in known}
+    contenders = [i for i in range(n) if i not in known_set]
+    fit = fit_scores(
+        win_matrix, previous=None if initial is None else {"strengths": initial}, z=z
+    )
+    if not contenders or not known_set:
+        return win_matrix
+
+    ranked = sorted(known_set, key=lambda i: -fit["scores"][i])
+    spread = np.linspace(0, len(ranked) - 1, min(anchors, len(ranked)))
+    pairs = [
+        (i, ranked[position])
+        for i in contenders
+        for position in np.unique(spread.round().astype(int))
+    ]
+    played = set()
+    for round_number in range(max_rounds + 1):
+        if round_number > 0:
+            fit = fit_scores(win_matrix, previous=fit, z=z)
+            members = await asyncio.to_thread(top_k_posterior, win_matrix, fit, k)
+            if top_k_settled(fit, k, members):
+                break
+            scores = np.log(fit["scores"])
+            floor = fit["lower"][np.argsort(-scores)[:k]].min()
+            contenders = [i for i in contenders if fit["upper"][i] >= floor]
+            pairs = []
+            for i in contenders:
+                distance = np.abs(scores - scores[i])
+                for j in np.argsort(distance, kind="stable"):
+                    j = int(j)
+                    if j != i and (min(i, j), max(i, j)) not in played:
+                        pairs.append((i, j))
+                        break
+        if not pairs or _exhausted(budget):
+            break
+        await play_round(pairs, judge, win_matrix, budget)
+        played.update((min(i, j), max(i, j)) for i, j in pairs)
+        if on_round is not None:
+            await on_round(win_matrix)
+    return win_matrix
+
+
+RANKING_STRATEGIES = {
+    "exhaustive": exhaustive_rank,
+    "swiss": swiss_rank,
+    "active": active_rank,
+    "listwise": listwise_rank,
+    "anytime": anytime_rank,
+}
+
+
+async def rank_pairwise(
+    n, judge, strategy="anytime", k=3, group_judge=None, group_size=8, **options
+):
+    """
+    Run the named ranking strategy and return (win_matrix, scores).
+    group_judge and group_size are only used by the listwise strategy. Every
+    strategy accepts on_round, a coroutine function awaited with the win
+    matrix after each round of comparisons.
+    """
+    if strategy not in RANKING_STRATEGIES:
+        raise ValueError(f"Unknown ranking strategy: {strategy}")
+    if strategy == "listwise":
+        options.update(group_judge=group_judge, group_size=group_size)
+    win_matrix = await RANKING_STRATEGIES[strategy](n, judge, k=k, **options)
+    with get_metrics().stage("bradley_terry"):
+        if strategy == "exhaustive":
+            scores = bradley_terry_scores(win_matrix)
+        else:
+            scores = fit_scores(win_matrix)["scores"]
+    return win_matrix, scores
@@ -1,122 +1,630 @@
-import http.server
-import socketserver
-import json
 import asyncio
-import urllib.parse
-from functools import partial
-from conductor import investigate
+import json
+import multiprocessing
+import os
+import signal
+import shutil
+import socket
+import tempfile
+import time
+import aiohttp
+from aiohttp import web
+from cerebras.cloud.sdk import AsyncCerebras
+from conductor import investigate, investigate_batch, CEREBRAS_API_KEY, PODCAST_AUDIO_DIR
+from digests import DIGEST_WARMUP_INTERVAL, DigestWarmer
+from investigation_cache import InvestigationCoalescer
+from jobs import JobQueue, JobStore, QueueFull
+from judgment_cache import get_judgment_cache
+from summary_cache import get_summary_cache
+from llm_scheduler import get_openai_scheduler
+from metrics import get_metrics
+from papers import dumps
+from paper_store import (
+    PAPER_HARVEST_INTERVAL,
+    follow_store,
+    get_paper_store,
+    harvest_forever,
+)
 
 PORT = 8080
 IP = "172.16.244.154"
 
-class MyHandler(http.server.SimpleHTTPRequestHandler):
-    def add_cors_headers(self):
-        """Add CORS headers to the response"""
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-    
-    def do_OPTIONS(self):
-        """Handle OPTIONS request for CORS preflight"""
-        self.send_response(200)
-        self.add_cors_headers()
-        self.end_headers()
-    
-    def do_GET(self):
-        """Handle GET requests with query parameters"""
+# Connection pool shared by every investigation running on the server loop
+MAX_CONNECTIONS = 100
+# Most investigations accepted in one /batch request
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", 50))
+# Worker processes sharing the listening socket; 1 serves from this process
+WORKERS = int(os.environ.get("WORKERS", 1))
+# Workers report in every HEARTBEAT_INTERVAL seconds and are replaced when
+# their event loop has not done so for WORKER_TIMEOUT seconds
+HEARTBEAT_INTERVAL = 5
+WORKER_TIMEOUT = float(os.environ.get("WORKER_TIMEOUT", 60))
+# Time a stopping worker gets to finish the requests it is serving
+GRACEFUL_TIMEOUT = float(os.environ.get("GRACEFUL_TIMEOUT", 60))
+
+
+def add_cors_headers(response):
+    """Add CORS headers to the response"""
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, DELETE, OPTIONS'
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, X-Client-Id'
+
+
+@web.middleware
+async def cors_middleware(request, handler):
+    """Add CORS headers to every response"""
+    if request.method == 'OPTIONS':
+        # Handle OPTIONS request for CORS preflight
+        response = web.Response()
+    else:
         try:
-            # Parse the URL path and query parameters
-            if self.path.startswith('/responses'):
-                # Parse query parameters
-                query_components = urllib.parse.parse_qsl(urllib.parse.urlparse(self.path).query)
-                query_dict = dict(query_components)
-                
-                # Extract specific parameters
-                question = query_dict.get('question', '')
-                topic = query_dict.get('topic', '')
-                time_frame = query_dict.get('time_frame', 'week')
-                
-                # Create data dictionary to pass to investigate
-                data = {
-                    "question": question,
-                    "topic": topic,
-                    "time_frame": time_frame
-                }
-                
-                # Create a new event loop for this request
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
-                # Run the async function in the event loop
-                response = loop.run_until_complete(investigate(data))
-                loop.close()
-                
-                # Send the response
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.add_cors_headers()
-                self.end_headers()
-                self.wfile.write(json.dumps(response).encode())
-            else:
-                # For other paths, use the default handler
-                super().do_GET()
+            response = await handler(request)
+        except web.HTTPException as e:
+            response = e
         except Exception as e:
-            self.send_response(500)
-            self.add_cors_headers()
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            response = web.json_response({
                 "status": "error",
                 "message": str(e)
-            }).encode())
-    
-    def do_POST(self):
-        """Handle POST requests with JSON body"""
-        content_length = int(self.headers['Content-Length'])
-        post_data = self.rfile.read(content_length)
+            }, status=500)
+    if not response.prepared:
+        add_cors_headers(response)
+    return response
+
+
+def stream_format(request):
+    """
+    The streaming format asked for with ?stream=sse|ndjson or the Accept
+    header, or None for a single JSON response
+    """
+    requested = request.query.get('stream', '').lower()
+    accept = request.headers.get('Accept', '')
+    if requested == 'sse' or 'text/event-stream' in accept:
+        return 'sse'
+    if requested in ('1', 'true', 'ndjson') or 'application/x-ndjson' in accept:
+        return 'ndjson'
+    return None
+
+
+def encode_event(event, fmt):
+    """Encode one progress event as an SSE message or an NDJSON line"""
+    payload = dumps(event)
+    if fmt == 'sse':
+        return f"event: {event['event']}\ndata: {payload}\n\n".encode()
+    return f"{payload}\n".encode()
+
+
+def with_timing(request, data, result):
+    """
+    The result without its per-stage timing unless the client asked for it
+    with ?timing=1 or "timing": true
+    """
+    wanted = request.query.get('timing', '').lower() in ('1', 'true') or data.get('timing')
+    if wanted or 'timing' not in result:
+        return result
+    return {key: value for key, value in result.items() if key != 'timing'}
+
+
+def compute_investigation(app, data, progress=None):
+    """Run investigate on the shared session and Cerebras client"""
+    return investigate(
+        data,
+        session=app['session'],
+        cerebras_client=app['cerebras'],
+        progress=progress,
+    )
+
+
+def start_investigation(app, data, progress=None):
+    """
+    Run an investigation, sharing one computation between identical
+    concurrent requests, and count it towards the digests kept warm
+    """
+    app['digests'].record(data)
+    return app['investigations'].run(
+        data, lambda publish: compute_investigation(app, data, publish), progress
+    )
+
+
+async def open_stream(request, fmt):
+    """Start a streaming response in the given format"""
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream' if fmt == 'sse' else 'application/x-ndjson',
+        'Cache-Control': 'no-cache',
+        # Ask reverse proxies not to buffer the stream
+        'X-Accel-Buffering': 'no',
+    })
+    add_cors_headers(response)
+    await response.prepare(request)
+    return response
+
+
+async def run_investigation(request, data):
+    """Answer an investigation request, streaming progress if asked to"""
+    app = request.app
+    fmt = stream_format(request)
+    if fmt is None:
+        response = await start_investigation(app, data)
+        return web.json_response(with_timing(request, data, response), dumps=dumps)
+
+    # Stream progress events as the pipeline advances, then the full result
+    response = await open_stream(request, fmt)
+    task = asyncio.current_task()
+
+    async def progress(event):
         try:
-            data = json.loads(post_data)
-            
-            # Create a new event loop for this request
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            # Run the async function in the event loop
-            response = loop.run_until_complete(investigate(data))
-            loop.close()
-            
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.add_cors_headers()
-            self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
-        except json.JSONDecodeError:
-            self.send_response(400)
-            self.add_cors_headers()
-            self.end_headers()
-            self.wfile.write(json.dumps({
-                "status": "error",
-                "message": "Invalid JSON"
-            }).encode())
-        except Exception as e:
-            self.send_response(500)
-            self.add_cors_headers()
-            self.end_headers()
-            self.wfile.write(json.dumps({
-                "status": "error",
-                "message": str(e)
-            }).encode())
+            await response.write(encode_event(event, fmt))
+        except ConnectionResetError:
+            # The client went away, so stop spending on its investigation
+            task.cancel()
+
+    try:
+        result = await start_investigation(app, data, progress)
+        await progress({"event": "result", **with_timing(request, data, result)})
+        await response.write_eof()
+    except ConnectionResetError:
+        print("Client disconnected from streaming response")
+    return response
+
+
+async def handle_get_responses(request):
+    """Handle GET requests with query parameters"""
+    # Extract specific parameters
+    question = request.query.get('question', '')
+    topic = request.query.get('topic', '')
+    time_frame = request.query.get('time_frame', 'week')
+
+    # Create data dictionary to pass to investigate
+    data = {
+        "question": question,
+        "topic": topic,
+        "time_frame": time_frame
+    }
+    if request.query.get('podcast'):
+        data["podcast"] = request.query['podcast']
+    return await run_investigation(request, data)
+
+
+async def handle_post(request):
+    """Handle POST requests with JSON body"""
+    try:
+        data = json.loads(await request.read())
+    except json.JSONDecodeError:
+        return web.json_response({
+            "status": "error",
+            "message": "Invalid JSON"
+        }, status=400)
+    if not isinstance(data, dict):
+        return web.json_response({
+            "status": "error",
+            "message": "Expected a JSON object"
+        }, status=400)
+    return await run_investigation(request, data)
+
+
+async def handle_batch(request):
+    """
+    Run several investigations at once, given as {"items": [{"topic",
+    "question", "time_frame"}, ...]}, sharing paper fetches and judgments
+    between them. Streams every item's progress, tagged with its position,
+    if asked to
+    """
+    try:
+        data = json.loads(await request.read())
+    except json.JSONDecodeError:
+        return web.json_response({
+            "status": "error",
+            "message": "Invalid JSON"
+        }, status=400)
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return web.json_response({
+            "status": "error",
+            "message": "Expected {\"items\": [{\"topic\", \"question\", \"time_frame\"}, ...]}"
+        }, status=400)
+    if len(items) > BATCH_MAX_ITEMS:
+        return web.json_response({
+            "status": "error",
+            "message": f"At most {BATCH_MAX_ITEMS} items per batch"
+        }, status=413)
+
+    app = request.app
+
+    def batch_result(results):
+        return {
+            "status": "success",
+            "results": [
+                with_timing(request, data, result) for result in results
+            ],
+        }
+
+    fmt = stream_format(request)
+    if fmt is None:
+        results = await investigate_batch(
+            items, session=app['session'], cerebras_client=app['cerebras']
+        )
+        return web.json_response(batch_result(results), dumps=dumps)
+
+    response = await open_stream(request, fmt)
+    task = asyncio.current_task()
+
+    async def progress(event):
+        try:
+            await response.write(encode_event(event, fmt))
+        except ConnectionResetError:
+            # The client went away, so stop spending on its investigations
+            task.cancel()
+
+    try:
+        results = await investigate_batch(
+            items,
+            session=app['session'],
+            cerebras_client=app['cerebras'],
+            progress=progress,
+        )
+        await progress({"event": "result", **batch_result(results)})
+        await response.write_eof()
+    except ConnectionResetError:
+        print("Client disconnected from streaming response")
+    return response
+
+
+def client_id(request):
+    """Who a request comes from, for fairness between clients"""
+    return request.headers.get('X-Client-Id') or request.remote or 'unknown'
+
+
+async def handle_submit_job(request):
+    """Queue an investigation and answer with its job id at once"""
+    try:
+        data = json.loads(await request.read())
+    except json.JSONDecodeError:
+        return web.json_response({
+            "status": "error",
+            "message": "Invalid JSON"
+        }, status=400)
+    if not isinstance(data, dict):
+        return web.json_response({
+            "status": "error",
+            "message": "Expected a JSON object"
+        }, status=400)
+    try:
+        priority = int(data.pop('priority', 0))
+    except (TypeError, ValueError):
+        return web.json_response({
+            "status": "error",
+            "message": "priority must be an integer"
+        }, status=400)
+    try:
+        job = await request.app['jobs'].submit(data, client_id(request), priority)
+    except QueueFull as e:
+        return web.json_response({
+            "status": "error",
+            "message": str(e)
+        }, status=503, headers={'Retry-After': '30'})
+    return web.json_response({
+        "status": "queued",
+        "job_id": job.id,
+        "location": f"/jobs/{job.id}",
+    }, status=202)
+
+
+async def handle_get_job(request):
+    """Report a job's status, and its result once finished"""
+    record = request.app['jobs'].record(request.match_info['job_id'])
+    if record is None:
+        raise web.HTTPNotFound()
+    return web.json_response(record)
+
+
+async def handle_job_events(request):
+    """Stream a job's progress events, then its final record"""
+    jobs = request.app['jobs']
+    job_id = request.match_info['job_id']
+    if jobs.record(job_id) is None:
+        raise web.HTTPNotFound()
+    fmt = stream_format(request) or 'sse'
+    response = await open_stream(request, fmt)
+
+    async def progress(event):
+        await response.write(encode_event(event, fmt))
+
+    try:
+        record = await jobs.follow(job_id, progress)
+        await progress({"event": "job", **record})
+        await response.write_eof()
+    except ConnectionResetError:
+        # Only this subscription ends; the job keeps running
+        print("Client disconnected from job events")
+    return response
+
+
+async def handle_cancel_job(request):
+    """Cancel a queued or running job"""
+    job_id = request.match_info['job_id']
+    if request.app['jobs'].record(job_id) is None:
+        raise web.HTTPNotFound()
+    cancelled = request.app['jobs'].cancel(job_id)
+    return web.json_response({
+        "job_id": job_id,
+        "cancelled": cancelled,
+    }, status=202 if cancelled else 409)
+
+
+async def handle_health(request):
+    """Report that this worker's event loop is responsive"""
+    return web.json_response({
+        "status": "ok",
+        "worker": request.app['worker'],
+        "pid": os.getpid(),
+    })
+
+
+async def handle_metrics(request):
+    """
+    Serve the metrics in the Prometheus text format. Under serve_workers a
+    scrape reaches one worker, which answers for all of them from the
+    snapshots they save: counters and histograms are summed over the
+    workers, gauges keep a worker label.
+    """
+    metrics_dir = request.app['metrics_dir']
+    if metrics_dir is None:
+        text = get_metrics().render()
+    else:
+        await asyncio.to_thread(save_metrics, request.app)
+        text = get_metrics().render_workers(
+            await asyncio.to_thread(load_metrics, metrics_dir)
+        )
+    return web.Response(
+        text=text,
+        content_type='text/plain',
+        headers={'X-Content-Type-Options': 'nosniff'},
+    )
+
+
+def save_metrics(app):
+    """Write this worker's metrics snapshot for the other workers to read"""
+    path = os.path.join(app['metrics_dir'], f"worker-{app['worker']}.json")
+    fd, tmp = tempfile.mkstemp(dir=app['metrics_dir'], suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(get_metrics().snapshot(), f)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Error saving metrics: {e}")
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def load_metrics(metrics_dir):
+    """Read the latest metrics snapshot of every worker"""
+    snapshots = {}
+    for name in os.listdir(metrics_dir):
+        if not (name.startswith('worker-') and name.endswith('.json')):
+            continue
+        try:
+            with open(os.path.join(metrics_dir, name)) as f:
+                snapshots[int(name[len('worker-'):-len('.json')])] = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading metrics from {name}: {e}")
+    return snapshots
+
+
+def register_collectors(app):
+    """Report the state kept by the shared clients and caches as metrics"""
+    metrics = get_metrics()
+
+    def collect():
+        for name, value in get_openai_scheduler().stats.items():
+            yield f"openai_{name}_total", 'counter', {}, value
+        cache = get_judgment_cache()
+        if cache is not None:
+            stats = cache.stats()
+            yield "judgment_cache_hits_total", 'counter', {}, stats['hits']
+            yield "judgment_cache_misses_total", 'counter', {}, stats['misses']
+            yield "judgment_cache_entries", 'gauge', {}, stats['entries']
+        cache = get_summary_cache()
+        if cache is not None:
+            yield "summary_cache_entries", 'gauge', {}, cache.stats()['entries']
+        for name, value in app['investigations'].stats.items():
+            yield "investigation_cache_total", 'counter', {"result": name}, value
+        yield "investigations_in_flight", 'gauge', {}, len(app['investigations'].in_flight)
+        yield "digests_tracked", 'gauge', {}, len(app['digests'].requests)
+        for name, value in app['digests'].stats.items():
+            yield "digest_warmups_total", 'counter', {"result": name}, value
+        yield "paper_store_papers", 'gauge', {}, len(get_paper_store())
+        for name, value in app['jobs'].stats.items():
+            yield "jobs_total", 'counter', {"result": name}, value
+        yield "jobs_queued", 'gauge', {}, app['jobs'].queued
+        yield "jobs_running", 'gauge', {}, app['jobs'].running
+        yield "worker_info", 'gauge', {"worker": app['worker'], "pid": os.getpid()}, 1
+
+    metrics.add_collector(collect)
+
+
+async def on_startup(app):
+    """Create the app-wide HTTP session, Cerebras client and investigation cache"""
+    connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS)
+    app['session'] = aiohttp.ClientSession(connector=connector)
+    app['investigations'] = InvestigationCoalescer()
+    app['digests'] = DigestWarmer(
+        lambda data, publish: compute_investigation(app, data, publish),
+        app['investigations'],
+    )
+    app['jobs'] = JobQueue(
+        lambda data, progress: start_investigation(app, data, progress), JobStore()
+    )
+    app['jobs'].start()
+    register_collectors(app)
+    app['cerebras'] = (
+        AsyncCerebras(api_key=CEREBRAS_API_KEY) if CEREBRAS_API_KEY else None
+    )
+    # Keep the local paper store fresh for the topics users ask about. With
+    # several workers only the first harvests; the others reload its saves
+    if PAPER_HARVEST_INTERVAL > 0:
+        store = get_paper_store()
+        if app['worker'] == 0:
+            app['harvester'] = asyncio.create_task(harvest_forever(store))
+        else:
+            app['harvester'] = asyncio.create_task(follow_store(store))
+    if app['heartbeats'] is not None:
+        app['heartbeat'] = asyncio.create_task(heartbeat(app))
+    # Keep the most requested digests ready without waiting for a request
+    if DIGEST_WARMUP_INTERVAL > 0:
+        app['warmer'] = asyncio.create_task(app['digests'].run_forever())
+
+
+async def heartbeat(app):
+    """
+    Tell the master process this worker's event loop is still running, and
+    save its metrics for whichever worker the next scrape reaches
+    """
+    while True:
+        app['heartbeats'][app['worker']] = time.time()
+        if app['metrics_dir'] is not None:
+            await asyncio.to_thread(save_metrics, app)
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+
+async def on_cleanup(app):
+    """Stop background work and close shared connections"""
+    await app['jobs'].stop()
+    for task in ('harvester', 'heartbeat', 'warmer'):
+        if task in app:
+            app[task].cancel()
+    await app['session'].close()
+    if app['cerebras'] is not None:
+        await app['cerebras'].close()
+
+
+def make_app(worker=0, heartbeats=None, metrics_dir=None):
+    app = web.Application(middlewares=[cors_middleware])
+    app['worker'] = worker
+    app['heartbeats'] = heartbeats
+    app['metrics_dir'] = metrics_dir
+    app.router.add_get('/responses', handle_get_responses)
+    app.router.add_get('/health', handle_health)
+    app.router.add_post('/jobs', handle_submit_job)
+    app.router.add_get('/jobs/{job_id}', handle_get_job)
+    app.router.add_get('/jobs/{job_id}/events', handle_job_events)
+    app.router.add_delete('/jobs/{job_id}', handle_cancel_job)
+    app.router.add_get('/metrics', handle_metrics)
+    app.router.add_post('/batch', handle_batch)
+    app.router.add_post('/{tail:.*}', handle_post)
+    # Only the generated podcast audio is served; the working directory
+    # holds the job store and caches with every client's requests
+    os.makedirs(PODCAST_AUDIO_DIR, exist_ok=True)
+    app.router.add_static('/podcast_audio', PODCAST_AUDIO_DIR)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def run_worker(sock, worker, heartbeats, metrics_dir):
+    """Serve on the inherited socket until told to stop"""
+    for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, signal.SIG_DFL)
+    web.run_app(
+        make_app(worker, heartbeats, metrics_dir),
+        sock=sock,
+        print=None,
+        shutdown_timeout=GRACEFUL_TIMEOUT,
+    )
+
+
+def serve_workers(workers=WORKERS, port=PORT):
+    """
+    Pre-fork server: the master process binds the socket and keeps workers
+    processes serving on it. Each worker runs its own event loop, so the
+    CPU-bound parts of requests use every core.
+
+    A worker that exits, or whose event loop stops sending heartbeats, is
+    replaced. SIGHUP restarts the workers gracefully: new ones start at once
+    while the old ones finish their requests. SIGTERM and SIGINT stop them all.
+
+    State that should not warm up separately in every worker is shared on
+    disk: the judgment and summary caches (SQLite), the paper store (harvested by worker 0
+    and reloaded by the others) and the TTS cache. Each worker keeps the
+    digests its own traffic asks for warm, mostly from those shared caches.
+
+    Each worker also saves a snapshot of its metrics to a temporary directory
+    with every heartbeat, so /metrics reports all the workers whichever one
+    serves the scrape (see handle_metrics). The snapshots of other workers
+    are up to HEARTBEAT_INTERVAL seconds old.
+    """
+    sock = socket.create_server(('', port), backlog=1024)
+    sock.set_inheritable(True)
+    heartbeats = multiprocessing.Array('d', workers, lock=False)
+    metrics_dir = tempfile.mkdtemp(prefix='metrics-')
+    children = {}
+    retiring = set()
+    state = {'restart': False, 'stop': False}
+
+    def spawn(worker):
+        heartbeats[worker] = time.time()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(sock, worker, heartbeats, metrics_dir)
+            finally:
+                os._exit(0)
+        children[pid] = worker
+
+    def on_signal(signum, frame):
+        state['restart' if signum == signal.SIGHUP else 'stop'] = True
+
+    for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, on_signal)
+    for worker in range(workers):
+        spawn(worker)
+    print(f"Serving on port {port} with {workers} workers")
+
+    while not state['stop']:
+        # Replace workers that exited, but not the ones being retired
+        while children or retiring:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                break
+            retiring.discard(pid)
+            worker = children.pop(pid, None)
+            if worker is not None and not state['stop']:
+                print(f"Worker {worker} (pid {pid}) exited with {status}, restarting")
+                spawn(worker)
+
+        now = time.time()
+        for pid, worker in list(children.items()):
+            if now - heartbeats[worker] > WORKER_TIMEOUT:
+                print(f"Worker {worker} (pid {pid}) stopped responding, killing it")
+                os.kill(pid, signal.SIGKILL)
+
+        if state['restart']:
+            state['restart'] = False
+            for pid, worker in list(children.items()):
+                del children[pid]
+                retiring.add(pid)
+                os.kill(pid, signal.SIGTERM)
+                spawn(worker)
+        time.sleep(1)
+
+    for pid in list(children) + list(retiring):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in list(children) + list(retiring):
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    sock.close()
+    shutil.rmtree(metrics_dir, ignore_errors=True)
 
-# Modify the TCP server to use ThreadingMixIn for better handling of concurrent requests
-class ThreadedHTTPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
-    daemon_threads = True
-    allow_reuse_address = True
 
 if __name__ == "__main__":
-    # Use the threaded server instead of the basic TCPServer
-    with ThreadedHTTPServer(("", PORT), MyHandler) as httpd:
+    if WORKERS > 1:
+        serve_workers(WORKERS)
+    else:
+        # One long-lived event loop serves every request concurrently
         print(f"Serving on port {PORT}")
-        try:
-            httpd.serve_forever()
-        except KeyboardInterrupt:
-            print("\nShutting down server...")
-            httpd.shutdown()
\ No newline at end of file
+        web.run_app(make_app(), port=PORT, print=None)
@@ -0,0 +1,158 @@
+import sqlite3
+import threading
+import time
+
+# Hits whose last_used update is held back and written in one transaction
+TOUCH_BATCH = 100
+# Writes between expiry and eviction passes, which scan the table
+EVICT_EVERY = 100
+
+
+class SQLiteCache:
+    """
+    On-disk store behind the judgment and summary caches: one SQLite table
+    of entries, each with the time it was created and last used.
+
+    Subclasses name the table and give its key and value columns as (name,
+    SQL type) pairs, then read and write entries as tuples with _lookup and
+    _store. Entries expire after ttl seconds and the least recently used ones
+    are evicted once the table holds more than max_entries. Hits only note
+    their last use in memory; it is written with the next store, or every
+    TOUCH_BATCH hits. Safe to share between threads.
+
+    Lookups and stores block on SQLite, which may wait for another process
+    holding the write lock, so async callers run them with asyncio.to_thread.
+    A cache is never worth failing a request for: SQLite errors are logged,
+    a failed lookup counts as a miss and a failed store is dropped.
+    """
+
+    table = None
+    key_columns = ()
+    value_columns = ()
+
+    def __init__(self, path, ttl, max_entries):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._touched = {}
+        self._lock = threading.Lock()
+
+        table = self.table
+        keys = [name for name, _ in self.key_columns]
+        values = [name for name, _ in self.value_columns]
+        match = " AND ".join(f"{name} = ?" for name in keys)
+        columns = [
+            f"{name} {kind} NOT NULL"
+            for name, kind in self.key_columns + self.value_columns
+        ]
+        placeholders = ", ".join("?" * (len(keys) + len(values) + 2))
+        self._select = (
+            f"SELECT {', '.join(values)} FROM {table} WHERE {match} AND created >= ?"
+        )
+        self._insert = f"INSERT OR REPLACE INTO {table} VALUES ({placeholders})"
+        self._update = f"UPDATE {table} SET last_used = ? WHERE {match}"
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps the file consistent without a sync on every commit
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                {', '.join(columns)},
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY ({', '.join(keys)})
+            )
+            """)
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_last_used ON {table} (last_used)"
+        )
+        self._conn.commit()
+        (self._entries,) = self._conn.execute(
+            f"SELECT COUNT(*) FROM {table}"
+        ).fetchone()
+
+    def _lookup(self, key):
+        """
+        Return the value columns stored under key, or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    self._select, (*key, now - self.ttl)
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"Error reading the {self.table} cache: {e}")
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[key] = now
+            if len(self._touched) >= TOUCH_BATCH:
+                try:
+                    self._touch()
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    print(f"Error writing to the {self.table} cache: {e}")
+                    self._conn.rollback()
+        return row
+
+    def _store(self, key, values):
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute(self._insert, (*key, *values, now, now))
+                self._touched.pop(key, None)
+                self._touch()
+                self._writes += 1
+                count = None
+                if self._writes % EVICT_EVERY == 0:
+                    count = self._evict(now)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"Error writing to the {self.table} cache: {e}")
+                self._conn.rollback()
+                return
+            # Replacing a row counts it twice until the next eviction recounts
+            self._entries = self._entries + 1 if count is None else count
+
+    def _touch(self):
+        if self._touched:
+            # Cleared first, so a failing batch is not retried on every write
+            touched, self._touched = self._touched, {}
+            self._conn.executemany(
+                self._update, [(used, *key) for key, used in touched.items()]
+            )
+
+    def _evict(self, now):
+        table = self.table
+        self._conn.execute(f"DELETE FROM {table} WHERE created < ?", (now - self.ttl,))
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+        if count > self.max_entries:
+            # Evict down to 90% so we do not pay for a delete on every insert
+            excess = count - int(self.max_entries * 0.9)
+            self._conn.execute(
+                f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table}"
+                " ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            count -= excess
+        return count
+
+    def stats(self):
+        """
+        Hit/miss counters since this process started, plus the size as of
+        this process's last write; it is recounted on every eviction pass.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": self._entries,
+        }
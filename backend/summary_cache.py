@@ -0,0 +1,80 @@
+import hashlib
+import os
+import threading
+
+from judgment_cache import normalize_question
+from sqlite_cache import SQLiteCache
+
+SUMMARY_CACHE_PATH = os.environ.get("SUMMARY_CACHE_PATH", "summary_cache.sqlite3")
+SUMMARY_CACHE_TTL = float(os.environ.get("SUMMARY_CACHE_TTL", 7 * 24 * 3600))
+SUMMARY_CACHE_MAX_ENTRIES = int(os.environ.get("SUMMARY_CACHE_MAX_ENTRIES", 20000))
+
+
+def summary_key(papers, question, model, version):
+    """
+    Content address of a synthesis: the sorted entry_ids of the papers, the
+    normalized question, the model and the prompt template version.
+    """
+    ids = sorted(paper["entry_id"] for paper in papers)
+    text = "\n".join([*ids, normalize_question(question), model, str(version)])
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def podcast_key(papers, summary, question, model, version):
+    """
+    Content address of a podcast script: the summary_key of its papers and
+    question plus a hash of the summary it was written from.
+    """
+    summary_hash = hashlib.sha256((summary or "").encode()).hexdigest()
+    key = summary_key(papers, question, model, version)
+    return hashlib.sha256(f"podcast\n{key}\n{summary_hash}".encode()).hexdigest()
+
+
+class SummaryCache(SQLiteCache):
+    """
+    On-disk cache of generated syntheses, keyed by summary_key, and of the
+    podcast scripts written from them, keyed by podcast_key.
+
+    The top papers for a topic rarely change within a day, so the same
+    synthesis is asked for over and over. Expiry, eviction and hit counting
+    are those of SQLiteCache.
+    """
+
+    table = "summaries"
+    key_columns = (("key", "TEXT"),)
+    value_columns = (("summary", "TEXT"),)
+
+    def __init__(
+        self,
+        path=SUMMARY_CACHE_PATH,
+        ttl=SUMMARY_CACHE_TTL,
+        max_entries=SUMMARY_CACHE_MAX_ENTRIES,
+    ):
+        super().__init__(path, ttl, max_entries)
+
+    def get(self, key):
+        """
+        Return the cached summary text, or None on a miss.
+        """
+        row = self._lookup((key,))
+        return row[0] if row is not None else None
+
+    def put(self, key, summary):
+        self._store((key,), (summary,))
+
+
+_summary_cache = None
+_summary_cache_lock = threading.Lock()
+
+
+def get_summary_cache():
+    """
+    The process-wide summary cache, or None when SUMMARY_CACHE_PATH is empty.
+    """
+    global _summary_cache
+    if not SUMMARY_CACHE_PATH:
+        return None
+    with _summary_cache_lock:
+        if _summary_cache is None:
+            _summary_cache = SummaryCache()
+        return _summary_cache